@@ -0,0 +1,127 @@
+import json
+import threading
+
+from utils import log
+from transport import build_openai_client, prewarm, ChatStream
+
+
+# ----------------------------------------------------------
+# 답변 생성 백엔드
+# open_stream() 이 돌려주는 스트림은 ChatStream 과 같은 모양:
+#   for piece in stream  → 답변 조각(str)
+#   stream.close()       → 중단 (다른 스레드에서 호출 가능)
+#   stream.cancelled / stream.cancel_event
+# ----------------------------------------------------------
+class Backend:
+    name = ""
+
+    def open_stream(self, model, messages, cancel_event=None):
+        raise NotImplementedError
+
+
+# OpenAI API (또는 base_url 로 지정한 호환 서버)
+class OpenAIBackend(Backend):
+    name = "openai"
+
+    def __init__(self, api_key, transport):
+        self.transport = transport
+        self.client = build_openai_client(api_key, transport)
+        if transport["prewarm"]:
+            prewarm(self.client)
+
+    def open_stream(self, model, messages, cancel_event=None):
+        return ChatStream(
+            self.client, self.transport,
+            cancel_event=cancel_event,
+            model=model,
+            messages=messages
+        )
+
+
+# ----------------------------------------------------------
+# 네트워크 없는 가짜 스트림 (같은 프로세스 안에서 바로 생성)
+# ----------------------------------------------------------
+class MockStream:
+
+    def __init__(self, reply, ttft, token_rate, cancel_event=None):
+        self.reply = reply
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.cancel_event = cancel_event or threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def __iter__(self):
+        if self.cancel_event.wait(self.ttft):
+            return
+        interval = 1.0 / self.token_rate if self.token_rate else 0
+        for piece in self.reply:
+            if self.cancelled:
+                return
+            yield piece
+            if interval and self.cancel_event.wait(interval):
+                return
+
+    def close(self):
+        self.cancel_event.set()
+
+
+class MockBackend(Backend):
+    """
+    ttft:       첫 글자까지 지연 (초)
+    token_rate: 초당 조각 수 (0 = 지연 없이)
+    tokens:     답변 조각 수
+    echo:       받은 메시지 크기를 답변 앞에 붙임
+    """
+    name = "mock"
+
+    def __init__(self, ttft=0.3, token_rate=50, tokens=200, echo=True):
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.echo = echo
+
+    def open_stream(self, model, messages, cancel_event=None):
+        return MockStream(
+            mock_reply(messages, self.tokens, self.echo),
+            self.ttft, self.token_rate, cancel_event
+        )
+
+
+def mock_reply(messages, tokens, echo=True):
+    pieces = []
+    if echo:
+        size = len(json.dumps(messages, ensure_ascii=False))
+        pieces.append(f"[mock] {len(messages)} messages, {size} bytes. ")
+    pieces += [f"token{i} " for i in range(tokens)]
+    return pieces
+
+
+# ----------------------------------------------------------
+# storage/backend.json 으로 선택
+#   {"type": "openai"}                      (기본, api_key.json 필요)
+#   {"type": "mock", "ttft": 0.3, ...}      (키/네트워크 없이)
+#   {"type": "openai", "api_key": "x"} + transport_settings.base_url
+#       → 로컬 mock_server.py 로 HTTP 경로까지 측정
+# ----------------------------------------------------------
+def create_backend(cfg, api_key=None, transport=None):
+    cfg = cfg or {}
+    kind = cfg.get("type", "openai")
+
+    if kind == "mock":
+        return MockBackend(
+            ttft=cfg.get("ttft", 0.3),
+            token_rate=cfg.get("token_rate", 50),
+            tokens=cfg.get("tokens", 200),
+            echo=cfg.get("echo", True),
+        )
+
+    if kind != "openai":
+        log(f"[backends] 알 수 없는 backend: {kind} → openai")
+
+    api_key = cfg.get("api_key") or api_key
+    if not api_key:
+        raise Exception("API Key not found.")
+    return OpenAIBackend(api_key, transport)
@@ -0,0 +1,192 @@
+import sys
+import json
+import math
+import time
+import base64
+import argparse
+import tempfile
+
+from capture_engine import BACKENDS as CAPTURE_BACKENDS, FakeBackend, timed_grab
+from image_pipeline import image_settings, prepare_image
+from image_store import ImageStore
+from history_store import HistoryStore
+from transport import DEFAULT_TRANSPORT_SETTINGS
+from settings import with_defaults
+from backends import MockBackend, OpenAIBackend
+from mock_server import MockServer
+from gpt_client import GPTClient
+from utils import now_timestamp, today_str
+from tracing import tracer
+
+
+STAGES = ["capture", "encode", "upload", "first_token", "last_token", "persist", "total"]
+
+
+# ----------------------------------------------------------
+# 백분위수 (nearest-rank)
+# ----------------------------------------------------------
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+# ----------------------------------------------------------
+# 1회: 캡처 → 인코딩 → 업로드 → 첫 글자 → 마지막 글자 → 기록 저장
+# (모든 값은 ms, first/last_token 은 요청 시작 기준)
+# ----------------------------------------------------------
+def run_once(index, gpt, grabber, img_settings, image_store, history_store, server=None):
+    t0 = time.perf_counter()
+    img = timed_grab(grabber)
+    t_capture = time.perf_counter()
+
+    prepared = prepare_image(img, img_settings)
+    image_b64 = base64.b64encode(prepared["data"]).decode()
+    t_encode = time.perf_counter()
+
+    first = []
+
+    def on_delta(piece):
+        if not first:
+            first.append(time.perf_counter())
+
+    # 실행마다 새 세션 → history 가 쌓여 결과가 흔들리지 않게
+    t_request = time.perf_counter()
+    full = gpt.send_message(
+        "benchmark", image_b64, on_delta=on_delta,
+        image_mime=prepared["mime"], session_id=f"bench-{index}"
+    )
+    t_last = time.perf_counter()
+
+    ref = image_store.put_bytes(prepared["data"], prepared["ext"])
+    history_store.append({
+        "role": "user", "text": "benchmark", "img_ref": ref,
+        "timestamp": now_timestamp(), "date": today_str()
+    })
+    history_store.append({
+        "role": "assistant", "text": full,
+        "timestamp": now_timestamp(), "date": today_str()
+    })
+    t_persist = time.perf_counter()
+
+    result = {
+        "capture": (t_capture - t0) * 1000,
+        "encode": (t_encode - t_capture) * 1000,
+        "first_token": ((first[0] if first else t_last) - t_request) * 1000,
+        "last_token": (t_last - t_request) * 1000,
+        "persist": (t_persist - t_last) * 1000,
+        "total": (t_persist - t0) * 1000,
+        "bytes": prepared["meta"]["bytes"],
+    }
+
+    # 같은 프로세스의 mock 서버가 본문을 다 받은 시각 → 업로드 시간
+    if server is not None and server.last_request:
+        result["upload"] = (server.last_request["received"] - t_request) * 1000
+
+    # 다 쓴 세션은 정리
+    gpt.sessions.pop(f"bench-{index}", None)
+    return result
+
+
+def summarize(results):
+    summary = {}
+    for stage in STAGES:
+        values = [r[stage] for r in results if stage in r]
+        if values:
+            summary[stage] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "min": min(values),
+                "max": max(values),
+            }
+    return summary
+
+
+def print_summary(summary, runs, payload_bytes):
+    print(f"\nruns: {runs}, payload p50: {payload_bytes / 1024:.0f} KB")
+    print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'min':>10}{'max':>10}")
+    for stage in STAGES:
+        if stage in summary:
+            s = summary[stage]
+            print(f"{stage:<12}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['min']:>10.1f}{s['max']:>10.1f}")
+
+
+# ----------------------------------------------------------
+# 실행: python benchmark.py --runs 20 --backend server --size 3840x2160
+# ----------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AutoCaptureGPT 지연 시간 벤치마크 (오프라인)")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--backend", choices=["server", "inproc"], default="server",
+                        help="server: 로컬 HTTP mock 서버 / inproc: 네트워크 없이")
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-rate", type=float, default=100)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--capture", choices=sorted(CAPTURE_BACKENDS), default="fake")
+    parser.add_argument("--size", default="2560x1440", help="fake 캡처 크기 WxH")
+    parser.add_argument("--format", default=None, help="png | jpeg | webp")
+    parser.add_argument("--max-edge", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    args = parser.parse_args(argv)
+
+    # 캡처
+    if args.capture == "fake":
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        grabber = FakeBackend((w, h))
+    else:
+        grabber = CAPTURE_BACKENDS[args.capture]()
+
+    # 이미지 설정
+    overrides = {}
+    if args.format:
+        overrides["format"] = args.format
+    if args.max_edge is not None:
+        overrides["max_edge"] = args.max_edge
+    img_settings = image_settings(overrides)
+
+    # 답변 백엔드
+    server = None
+    if args.backend == "server":
+        server = MockServer(ttft=args.ttft, token_rate=args.token_rate, tokens=args.tokens).start()
+        transport = with_defaults(DEFAULT_TRANSPORT_SETTINGS,
+                                  {"base_url": server.base_url, "prewarm": False})
+        backend = OpenAIBackend("mock-key", transport)
+    else:
+        backend = MockBackend(ttft=args.ttft, token_rate=args.token_rate, tokens=args.tokens)
+    # 답변 캐시는 끄고 항상 실제 경로를 측정
+    gpt = GPTClient(backend=backend, use_cache=False)
+    # 임시 저장소만 쓰도록 trace 파일도 쓰지 않음 (단계 시간은 직접 잼)
+    tracer.configure(enabled=False)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        image_store = ImageStore(tmp + "/images")
+        history_store = HistoryStore(tmp + "/chat_history.jsonl", legacy_path=None)
+
+        for i in range(args.warmup + args.runs):
+            r = run_once(i, gpt, grabber, img_settings, image_store, history_store, server)
+            if i >= args.warmup:
+                results.append(r)
+                if not args.json:
+                    print(f"run {i - args.warmup + 1}: total {r['total']:.0f} ms, "
+                          f"first token {r['first_token']:.0f} ms")
+
+    if server is not None:
+        server.stop()
+
+    summary = summarize(results)
+    payload = percentile([r["bytes"] for r in results], 50)
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "payload_bytes_p50": payload,
+                          "stages": summary}, indent=2))
+    else:
+        print_summary(summary, args.runs, payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
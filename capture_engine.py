@@ -1,32 +1,250 @@
+import os
+import sys
 import time
-from PIL import ImageGrab
+import ctypes
+import threading
+
+from PIL import Image, ImageGrab
 from utils import log
+from tracing import tracer
 from PySide6.QtWidgets import QApplication   # ★ 추가!
 
+
+# ----------------------------------------------------------
+# 캡처 백엔드
+# ----------------------------------------------------------
+# bbox: 가상 화면 좌표 (left, top, right, bottom), 물리 픽셀. None = 전체
+class CaptureBackend:
+    name = ""
+
+    def available(self):
+        return True
+
+    def grab(self, bbox=None):
+        raise NotImplementedError
+
+
+# PIL.ImageGrab (기본, 항상 사용 가능)
+class PILBackend(CaptureBackend):
+    name = "pil"
+
+    def grab(self, bbox=None):
+        try:
+            return ImageGrab.grab(bbox=bbox, all_screens=True)
+        except Exception:
+            return ImageGrab.grab(bbox=bbox)
+
+
+# mss (선택 설치: pip install mss) - 다중 모니터에서 훨씬 빠름
+class MSSBackend(CaptureBackend):
+    name = "mss"
+
+    def __init__(self):
+        # mss 인스턴스는 스레드마다 따로 만들어야 함
+        self._local = threading.local()
+
+    def available(self):
+        try:
+            import mss  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+            sct = mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def grab(self, bbox=None):
+        sct = self._sct()
+        if bbox:
+            # 필요한 영역만 읽음 (전체를 찍고 자르지 않음)
+            left, top, right, bottom = bbox
+            area = {"left": left, "top": top, "width": right - left, "height": bottom - top}
+        else:
+            area = sct.monitors[0]   # monitors[0] = 전체 가상 화면
+        shot = sct.grab(area)
+        return Image.frombuffer("RGB", shot.size, shot.bgra, "raw", "BGRX")
+
+
+# 가짜 화면 (헤드리스 테스트/벤치마크용)
+class FakeBackend(CaptureBackend):
+    name = "fake"
+
+    def __init__(self, size=(1920, 1080)):
+        self.size = size
+        self.frame = 0
+
+    def grab(self, bbox=None):
+        import numpy as np
+
+        w, h = self.size
+        self.frame += 1
+
+        # 프레임마다 조금씩 움직이는 그라데이션 + 번호 줄무늬
+        x = (np.arange(w, dtype=np.uint16) + self.frame * 8) % 256
+        y = np.arange(h, dtype=np.uint16) % 256
+        arr = np.empty((h, w, 3), dtype=np.uint8)
+        arr[:, :, 0] = x[None, :]
+        arr[:, :, 1] = y[:, None]
+        arr[:, :, 2] = (self.frame * 37) % 256
+        if bbox:
+            left, top, right, bottom = bbox
+            arr = arr[max(0, top):bottom, max(0, left):right]
+        return Image.fromarray(arr, "RGB")
+
+
+BACKENDS = {
+    "pil": PILBackend,
+    "mss": MSSBackend,
+    "fake": FakeBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+# ----------------------------------------------------------
+# 백엔드 선택 ("auto" = mss 가 있으면 mss, 없으면 pil)
+# ----------------------------------------------------------
+def set_backend(name="auto"):
+    global _backend
+
+    with _backend_lock:
+        if name == "auto":
+            mss_backend = MSSBackend()
+            _backend = mss_backend if mss_backend.available() else PILBackend()
+            return _backend
+
+        cls = BACKENDS.get(name)
+        if cls is None:
+            log(f"[capture_engine] 알 수 없는 백엔드: {name} → pil 사용")
+            cls = PILBackend
+
+        backend = cls()
+        if not backend.available():
+            log(f"[capture_engine] {name} 사용 불가 → pil 사용")
+            backend = PILBackend()
+
+        _backend = backend
+        return _backend
+
+
+def get_backend():
+    if _backend is None:
+        set_backend("auto")
+    return _backend
+
+
+# ----------------------------------------------------------
+# 캡처 + 시간 기록 (span 이름에 백엔드를 붙여 Ctrl+D 에서 백엔드끼리 비교)
+# ----------------------------------------------------------
+def timed_grab(backend, bbox=None):
+    start = time.perf_counter()
+    img = backend.grab(bbox)
+    end = time.perf_counter()
+    ms = (end - start) * 1000
+    tracer.record(f"capture:{backend.name}", start, end,
+                  area="full" if bbox is None else f"{img.width}x{img.height}")
+    log(f"[capture_engine] {backend.name} grab {ms:.1f} ms")
+    return img
+
+
+# ----------------------------------------------------------
+# 창을 캡처에서 제외 (Windows 10 2004+)
+# 성공하면 창을 숨기지 않고 그대로 찍어도 창이 나오지 않음
+# ----------------------------------------------------------
+WDA_EXCLUDEFROMCAPTURE = 0x11
+
+
+def exclude_window_from_capture(hwnd):
+    if sys.platform != "win32":
+        return False
+    try:
+        ok = ctypes.windll.user32.SetWindowDisplayAffinity(
+            ctypes.c_void_p(hwnd), WDA_EXCLUDEFROMCAPTURE
+        )
+        return bool(ok)
+    except Exception as e:
+        log(f"[capture_engine] SetWindowDisplayAffinity 실패: {e}")
+        return False
+
+
+# 창이 실제로 화면에서 내려갔는지 (Windows 는 OS 기준으로 확인)
+def window_hidden(hwnd):
+    if sys.platform != "win32":
+        return True
+    try:
+        return not ctypes.windll.user32.IsWindowVisible(ctypes.c_void_p(hwnd))
+    except Exception:
+        return True
+
+
+# 컴포지터가 다음 화면을 다 그릴 때까지 대기
+def _wait_compositor():
+    if sys.platform == "win32":
+        try:
+            ctypes.windll.dwmapi.DwmFlush()
+            return
+        except Exception:
+            pass
+    time.sleep(1 / 60)   # 한 프레임
+
+
+# ----------------------------------------------------------
+# 창이 숨겨질 때까지 대기 (최대 timeout 초)
+# ----------------------------------------------------------
+def wait_until_hidden(is_hidden=None, timeout=0.25, poll=0.005):
+    start = time.perf_counter()
+    deadline = start + timeout
+
+    while True:
+        QApplication.processEvents()
+        if is_hidden is None or is_hidden():
+            _wait_compositor()
+            break
+        if time.perf_counter() >= deadline:
+            log("[capture_engine] 창 숨김 대기 시간 초과")
+            break
+        time.sleep(poll)
+
+    end = time.perf_counter()
+    ms = (end - start) * 1000
+    tracer.record("hide_wait", start, end)
+    log(f"[capture_engine] hide wait {ms:.1f} ms")
+    return ms
+
+
 # ----------------------------------------------------------
 # 전체 화면 캡처 (챗창 숨기고 찍기)
 # ----------------------------------------------------------
-def capture_full_screen(hide=None, show=None):
+def capture_full_screen(hide=None, show=None, is_hidden=None, timeout=0.25, bbox=None):
     """
     hide: 윈도우를 숨기는 함수
     show: 윈도우를 다시 보이게 하는 함수
+    is_hidden: 창이 실제로 사라졌는지 확인하는 함수 (없으면 컴포지터만 대기)
+    timeout: 숨김 대기 최대 시간(초)
+    bbox: 찍을 영역 (가상 화면 좌표, 물리 픽셀). None = 모든 모니터
     """
 
     try:
-        # 창 숨기기
+        # 창 숨기기 → 실제로 사라질 때까지만 대기
         if hide:
             try:
                 hide()
-                QApplication.processEvents()   # ★ 창 숨김 즉시 반영
-                time.sleep(0.13)               # ★ 70ms 대기 → 안정적
+                wait_until_hidden(is_hidden, timeout)
             except:
                 log("[capture_engine] hide() 실행 실패")
 
-        # 전체 화면 캡처
+        # 화면 캡처 (bbox 가 있으면 그 영역만)
+        backend = get_backend()
         try:
-            img = ImageGrab.grab(all_screens=True)
-        except Exception:
-            img = ImageGrab.grab()
+            img = timed_grab(backend, bbox)
+        except Exception as e:
+            log(f"[capture_engine] {backend.name} 실패: {e} → pil 사용")
+            img = timed_grab(PILBackend(), bbox)
 
         # 창 복귀
         if show:
@@ -41,6 +259,168 @@ def capture_full_screen(hide=None, show=None):
         log(f"[capture_engine] ERROR: {e}")
 
         try:
-            return ImageGrab.grab()
+            return ImageGrab.grab(bbox=bbox)
         except:
             return None
+
+
+# ----------------------------------------------------------
+# 캡처 영역 구하기 → (left, top, right, bottom) 가상 화면 물리 픽셀, 실패 시 None
+# Qt 6 는 프로세스를 Per-Monitor DPI aware 로 만들므로 Win32 좌표 = 물리 픽셀
+# ----------------------------------------------------------
+DWMWA_EXTENDED_FRAME_BOUNDS = 9
+DWMWA_CLOAKED = 14
+GW_HWNDNEXT = 2
+GWL_EXSTYLE = -20
+WS_EX_TOOLWINDOW = 0x80
+MONITOR_DEFAULTTONEAREST = 2
+
+
+class MONITORINFO(ctypes.Structure):
+    _fields_ = [
+        ("cbSize", ctypes.c_ulong),
+        ("rcMonitor", ctypes.c_long * 4),
+        ("rcWork", ctypes.c_long * 4),
+        ("dwFlags", ctypes.c_ulong),
+    ]
+
+
+_user32 = None
+
+
+# HWND 는 64bit 포인터라 반환형을 지정해야 잘리지 않음
+def _win32():
+    global _user32
+    if _user32 is None:
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        user32.GetForegroundWindow.restype = wintypes.HWND
+        user32.GetWindow.restype = wintypes.HWND
+        user32.GetWindow.argtypes = [wintypes.HWND, wintypes.UINT]
+        user32.GetWindowLongW.argtypes = [wintypes.HWND, ctypes.c_int]
+        user32.MonitorFromPoint.restype = wintypes.HMONITOR
+        user32.MonitorFromPoint.argtypes = [wintypes.POINT, wintypes.DWORD]
+        _user32 = user32
+    return _user32
+
+
+def _window_pid(hwnd):
+    pid = ctypes.c_ulong()
+    _win32().GetWindowThreadProcessId(ctypes.c_void_p(hwnd), ctypes.byref(pid))
+    return pid.value
+
+
+# 그림자를 뺀 실제 창 테두리 (DWM), 안 되면 GetWindowRect
+def window_rect(hwnd):
+    rect = (ctypes.c_long * 4)()
+    try:
+        ok = ctypes.windll.dwmapi.DwmGetWindowAttribute(
+            ctypes.c_void_p(hwnd), DWMWA_EXTENDED_FRAME_BOUNDS,
+            ctypes.byref(rect), ctypes.sizeof(rect)
+        ) == 0
+    except Exception:
+        ok = False
+    if not ok and not _win32().GetWindowRect(ctypes.c_void_p(hwnd), ctypes.byref(rect)):
+        return None
+    left, top, right, bottom = rect
+    if right - left < 8 or bottom - top < 8:
+        return None
+    return (left, top, right, bottom)
+
+
+# 사용자가 보고 있는 일반 창인지 (숨김/최소화/가상 데스크톱에 가려짐/도구 창 제외)
+def _is_capture_target(hwnd, own_pid):
+    user32 = _win32()
+    if not user32.IsWindowVisible(ctypes.c_void_p(hwnd)) or user32.IsIconic(ctypes.c_void_p(hwnd)):
+        return False
+    if _window_pid(hwnd) == own_pid:
+        return False
+    if user32.GetWindowLongW(hwnd, GWL_EXSTYLE) & WS_EX_TOOLWINDOW:
+        return False
+    if user32.GetWindowTextLengthW(ctypes.c_void_p(hwnd)) == 0:
+        return False
+
+    cloaked = ctypes.c_int(0)
+    try:
+        ctypes.windll.dwmapi.DwmGetWindowAttribute(
+            ctypes.c_void_p(hwnd), DWMWA_CLOAKED,
+            ctypes.byref(cloaked), ctypes.sizeof(cloaked)
+        )
+    except Exception:
+        pass
+    return not cloaked.value
+
+
+# ----------------------------------------------------------
+# 활성 창 영역
+# 포커스가 이 앱에 있으면 (단축키를 누르는 중) 그 아래 z-order 의 첫 일반 창
+# ----------------------------------------------------------
+def active_window_bbox():
+    if sys.platform != "win32":
+        return None
+    try:
+        user32 = _win32()
+        own_pid = os.getpid()
+
+        hwnd = user32.GetForegroundWindow()
+        if hwnd and _window_pid(hwnd) != own_pid:
+            return window_rect(hwnd)
+
+        while hwnd:
+            hwnd = user32.GetWindow(hwnd, GW_HWNDNEXT)
+            if hwnd and _is_capture_target(hwnd, own_pid):
+                return window_rect(hwnd)
+    except Exception as e:
+        log(f"[capture_engine] active window ERROR: {e}")
+    return None
+
+
+# ----------------------------------------------------------
+# 마우스 커서가 있는 모니터 영역
+# Windows 는 Win32 로 정확히, 그 외에는 Qt 화면 정보로 근사 (GUI 스레드에서만)
+# ----------------------------------------------------------
+def cursor_monitor_bbox():
+    if sys.platform == "win32":
+        try:
+            from ctypes import wintypes
+            user32 = _win32()
+            pt = wintypes.POINT()
+            user32.GetCursorPos(ctypes.byref(pt))
+            monitor = user32.MonitorFromPoint(pt, MONITOR_DEFAULTTONEAREST)
+            info = MONITORINFO()
+            info.cbSize = ctypes.sizeof(MONITORINFO)
+            if user32.GetMonitorInfoW(monitor, ctypes.byref(info)):
+                return tuple(info.rcMonitor)
+        except Exception as e:
+            log(f"[capture_engine] cursor monitor ERROR: {e}")
+
+    # Qt 화면/커서 정보는 GUI 스레드에서만 (단축키 캡처 스레드면 전체 화면으로)
+    if threading.current_thread() is not threading.main_thread():
+        return None
+
+    try:
+        from PySide6.QtGui import QCursor, QGuiApplication
+        screen = QGuiApplication.screenAt(QCursor.pos()) or QGuiApplication.primaryScreen()
+        geo = screen.geometry()
+        dpr = screen.devicePixelRatio()
+        left, top = int(geo.x() * dpr), int(geo.y() * dpr)
+        return (left, top, left + int(geo.width() * dpr), top + int(geo.height() * dpr))
+    except Exception as e:
+        log(f"[capture_engine] cursor monitor ERROR: {e}")
+        return None
+
+
+# ----------------------------------------------------------
+# 캡처 범위 → bbox (full 또는 영역을 찾지 못하면 None = 모든 모니터)
+# ----------------------------------------------------------
+def mode_bbox(mode):
+    if mode == "window":
+        bbox = active_window_bbox()
+    elif mode == "monitor":
+        bbox = cursor_monitor_bbox()
+    else:
+        return None
+
+    if bbox is None:
+        log(f"[capture_engine] {mode} 영역을 찾지 못함 → 전체 화면")
+    return bbox
@@ -0,0 +1,164 @@
+import io
+import base64
+
+from PIL import Image
+from utils import log
+
+
+# ----------------------------------------------------------
+# 대화 맥락 예산 기본값 (storage/context_settings.json)
+# ----------------------------------------------------------
+DEFAULT_CONTEXT_SETTINGS = {
+    "max_tokens": 24000,        # 요청 1번에 보낼 history 추정 토큰 상한
+    "keep_images": 2,           # 원본 이미지를 유지할 최근 이미지 개수
+    "old_image_max_edge": 512,  # 오래된 이미지 축소 크기 (0 = 빼고 안내 문구만)
+    "max_messages": 60,         # 메모리에 들고 있을 최대 메시지 수
+    "summary_chars": 1500,      # 잘려나간 앞부분 요약 최대 글자 수
+}
+
+IMAGE_TOKENS = 1100         # 고해상도 이미지 1장 추정 토큰
+SMALL_IMAGE_TOKENS = 255    # 축소된 이미지 1장 추정 토큰
+OMITTED_IMAGE_TEXT = "[earlier screenshot omitted]"
+
+
+# ----------------------------------------------------------
+# 토큰 추정 (영문 ≈ 4글자/토큰, 한글 등 ≈ 1글자/토큰)
+# ----------------------------------------------------------
+def estimate_text_tokens(text):
+    if not text:
+        return 0
+    ascii_count = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_count // 4 + (len(text) - ascii_count) + 1
+
+
+def estimate_message_tokens(msg):
+    content = msg["content"]
+    if isinstance(content, str):
+        return estimate_text_tokens(content) + 4
+
+    tokens = 4
+    for part in content:
+        if part.get("type") == "text":
+            tokens += estimate_text_tokens(part["text"])
+        elif part.get("type") == "image_url":
+            tokens += SMALL_IMAGE_TOKENS if part.get("_small") else IMAGE_TOKENS
+    return tokens
+
+
+def message_text(msg):
+    content = msg["content"]
+    if isinstance(content, str):
+        return content
+    return " ".join(p["text"] for p in content if p.get("type") == "text")
+
+
+def _has_image(msg):
+    return isinstance(msg["content"], list) and \
+        any(p.get("type") == "image_url" for p in msg["content"])
+
+
+# ----------------------------------------------------------
+# 오래된 이미지 축소 / 제거 (history 자체를 고쳐서 한 번만 처리)
+# ----------------------------------------------------------
+def _shrink_image_part(part, max_edge):
+    url = part["image_url"]["url"]
+    try:
+        header, b64 = url.split(",", 1)
+        img = Image.open(io.BytesIO(base64.b64decode(b64)))
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS, reducing_gap=2.0)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=70)
+    except Exception as e:
+        log(f"[context_window] shrink ERROR: {e}")
+        return None
+
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode(),
+            "detail": "low",
+        },
+        "_small": True,
+    }
+
+
+def compact_images(history, keep_images, old_image_max_edge):
+    seen = 0
+    for msg in reversed(history):
+        if not _has_image(msg):
+            continue
+        seen += 1
+        if seen <= keep_images:
+            continue
+
+        parts = []
+        for part in msg["content"]:
+            if part.get("type") != "image_url" or part.get("_small"):
+                parts.append(part)
+                continue
+            small = _shrink_image_part(part, old_image_max_edge) if old_image_max_edge else None
+            parts.append(small or {"type": "text", "text": OMITTED_IMAGE_TEXT})
+        msg["content"] = parts
+
+
+# ----------------------------------------------------------
+# 예산 안에 들어가는 최근 메시지 + 앞부분 요약
+# ----------------------------------------------------------
+def summarize(messages, max_chars):
+    lines = []
+    for msg in messages:
+        text = " ".join(message_text(msg).split())
+        if not text:
+            continue
+        # 메시지마다 앞부분만
+        if len(text) > 200:
+            text = text[:200] + "…"
+        lines.append(f"{msg['role']}: {text}")
+
+    # 가까운 과거가 더 중요 → 오래된 줄부터 버림
+    total = sum(len(line) + 1 for line in lines)
+    while lines and total > max_chars:
+        total -= len(lines.pop(0)) + 1
+    return "\n".join(lines)
+
+
+# 예산 안에 들어가는 뒤쪽 메시지 → (개수, 추정 토큰)
+def context_tail(history, settings):
+    budget = settings["max_tokens"]
+    count = 0
+    used = 0
+
+    for msg in reversed(history):
+        cost = estimate_message_tokens(msg)
+        if count and used + cost > budget:
+            break
+        count += 1
+        used += cost
+    return count, used
+
+
+def build_context(history, settings):
+    count, used = context_tail(history, settings)
+    kept = history[len(history) - count:]
+    dropped = history[:len(history) - count]
+
+    messages = []
+    if dropped:
+        messages.append({
+            "role": "system",
+            "content": "Summary of the earlier conversation:\n"
+                       + summarize(dropped, settings["summary_chars"])
+        })
+
+    # 내부 표시용 키(_small, _fp)는 API 로 보내지 않음
+    for msg in kept:
+        content = msg["content"]
+        if isinstance(content, list):
+            content = [{k: v for k, v in p.items() if not k.startswith("_")}
+                       for p in content]
+        messages.append({"role": msg["role"], "content": content})
+
+    log(f"[context_window] {len(kept)}개 유지 / {len(dropped)}개 요약, 약 {used} tokens")
+    return messages
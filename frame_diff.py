@@ -0,0 +1,78 @@
+import numpy as np
+from PIL import Image
+
+from utils import pil_to_np
+
+
+# ----------------------------------------------------------
+# 화면 변화 감지 (흑백 이미지를 픽셀 단위로 비교 → 타일로 묶기)
+# ----------------------------------------------------------
+class FrameDiff:
+    """
+    직전에 보낸 캡처와 비교해 바뀐 타일만 찾는다.
+    타일 평균이 아니라 "많이 바뀐 픽셀 개수"로 판단해서
+    코드 한 줄, 에러 한 줄처럼 작은 글자 변화도 놓치지 않는다.
+    - max_edge:        비교 해상도 (긴 변, 1080p 는 원본 그대로)
+    - pixel_threshold: 이만큼 밝기가 바뀐 픽셀을 "바뀜"으로 봄
+    - min_pixels:      타일 안에 바뀐 픽셀이 이 개수 이상이면 바뀐 타일
+    compare() 결과:
+      changed: 의미 있는 변화가 있는지
+      bbox:    바뀐 영역 (원본 이미지 좌표, left/top/right/bottom)
+      ratio:   바뀐 타일 비율 (0~1)
+    """
+
+    def __init__(self, max_edge=1920, tile_px=32, pixel_threshold=24, min_pixels=2):
+        self.max_edge = max_edge
+        self.tile_px = tile_px
+        self.pixel_threshold = pixel_threshold
+        self.min_pixels = min_pixels
+        self.prev = None
+        self.prev_size = None
+
+    def _small(self, img):
+        scale = min(1.0, self.max_edge / max(img.size))
+        if scale < 1.0:
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            # 먼저 줄이고 흑백으로 (원본 크기의 흑백 사본을 만들지 않음)
+            img = img.resize(size, Image.BOX)
+        return pil_to_np(img.convert("L")).astype(np.int16)
+
+    def reset(self):
+        self.prev = None
+        self.prev_size = None
+
+    def compare(self, img):
+        cur = self._small(img)
+
+        if self.prev is None or self.prev_size != img.size:
+            self.prev, self.prev_size = cur, img.size
+            return {"changed": True, "bbox": None, "ratio": 1.0}
+
+        # 픽셀별로 바뀌었는지 → 타일마다 바뀐 픽셀 개수
+        changed = np.abs(cur - self.prev) > self.pixel_threshold
+        h, w = changed.shape
+        t = self.tile_px
+        rows, cols = -(-h // t), -(-w // t)
+        padded = np.zeros((rows * t, cols * t), dtype=np.uint16)
+        padded[:h, :w] = changed
+        counts = padded.reshape(rows, t, cols, t).sum(axis=(1, 3))
+        mask = counts >= self.min_pixels
+        ratio = float(mask.mean())
+
+        if not mask.any():
+            return {"changed": False, "bbox": None, "ratio": 0.0}
+
+        # 바뀐 경우에만 기준 프레임 갱신 (조금씩 바뀌는 것도 누적되어 잡힘)
+        self.prev = cur
+
+        hit_rows = np.where(mask.any(axis=1))[0]
+        hit_cols = np.where(mask.any(axis=0))[0]
+        sx = img.width / w
+        sy = img.height / h
+        bbox = (
+            int(hit_cols[0] * t * sx),
+            int(hit_rows[0] * t * sy),
+            min(img.width, int((hit_cols[-1] + 1) * t * sx)),
+            min(img.height, int((hit_rows[-1] + 1) * t * sy)),
+        )
+        return {"changed": True, "bbox": bbox, "ratio": ratio}
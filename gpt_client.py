@@ -1,28 +1,125 @@
-from openai import OpenAI
-from utils import load_json
+import time
+import threading
+
+from settings import settings
+from transport import DEFAULT_TRANSPORT_SETTINGS
+from backends import create_backend
+from context_window import (
+    DEFAULT_CONTEXT_SETTINGS, compact_images, build_context, context_tail, message_text
+)
+from response_cache import (
+    ResponseCache, DEFAULT_CACHE_SETTINGS, cache_key, question_fp, image_fingerprint
+)
+from scheduler import RequestScheduler, DEFAULT_SCHEDULER_SETTINGS
+from tracing import tracer
 
 # 시스템 프롬프트 불러오기 함수
 def load_system_prompt():
-    txt = load_json("storage/system_prompt.json")
+    txt = settings.get("system_prompt")
     if txt and txt.strip():
         return txt
     return "기본 시스템 프롬프트가 비어 있습니다."
 
-class GPTClient:
+MODEL = "gpt-5.1"
+
+# 중단된 답변 끝에 붙이는 표시 (모델이 보는 history 용)
+TRUNCATED_MARKER = "[response interrupted by user]"
 
-    def __init__(self):
-        keydata = load_json("storage/api_key.json")
-        if not keydata or "api_key" not in keydata:
-            raise Exception("API Key not found.")
+# 화면이 바뀌지 않아 이미지를 다시 보내지 않을 때 붙이는 안내
+UNCHANGED_SCREEN_NOTE = "(screen unchanged since the previous screenshot)"
 
-        self.client = OpenAI(api_key=keydata["api_key"])
 
-        # 최근 대화 저장 (텍스트 + 이미지 포함)
+# ----------------------------------------------------------
+# 대화 세션 (세션마다 history 가 따로)
+# ----------------------------------------------------------
+class Conversation:
+
+    def __init__(self, session_id):
+        self.session_id = session_id
         self.history = []
-        self.max_history = 10   # 최근 10개 유지
+        self.lock = threading.Lock()
+
+
+class GPTClient:
+
+    # use_cache=False: cache_settings 와 관계없이 항상 실제 요청 (벤치마크 등)
+    def __init__(self, backend=None, use_cache=True):
+        # keep-alive 연결 풀 + timeout + 재시도 (transport)
+        self.transport = settings.get_with_defaults(
+            "transport_settings", DEFAULT_TRANSPORT_SETTINGS
+        )
+
+        # 답변 백엔드 (기본 OpenAI, storage/backend.json 으로 mock 선택 가능)
+        if backend is None:
+            keydata = settings.get("api_key") or {}
+            backend = create_backend(
+                settings.get("backend"), keydata.get("api_key"), self.transport
+            )
+        self.backend = backend
+
+        # 대화 세션들 (텍스트 + 이미지 포함)
+        # 요청마다 보낼 범위는 토큰 예산으로 정함 (context_window)
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+
+        # 진행 중인 스트림 (cancel() 로 중단)
+        self._streams = set()
+        self._streams_lock = threading.Lock()
+
+        # 요청 대기열 (동시 실행 개수 제한)
+        sched = settings.get_with_defaults("scheduler_settings", DEFAULT_SCHEDULER_SETTINGS)
+        self.scheduler = RequestScheduler(self, sched["max_concurrency"])
+
+        # 답변 캐시 (cache_settings.enabled 일 때 처음 쓸 때 열림)
+        self.use_cache = use_cache
+        self._cache = None
+        self._cache_lock = threading.Lock()
+
+    def session(self, session_id="main"):
+        with self._sessions_lock:
+            conv = self.sessions.get(session_id)
+            if conv is None:
+                conv = self.sessions[session_id] = Conversation(session_id)
+            return conv
+
+    # 기본 세션의 history
+    @property
+    def history(self):
+        return self.session().history
+
+    # --------------------------------------------------------
+    # 대기열에 요청 넣기 → RequestHandle
+    # job(handle) 은 스케줄러 스레드에서 실행됨
+    # (보통 send_message(..., cancel_event=handle.cancel_event) 호출)
+    # --------------------------------------------------------
+    def submit(self, job, session_id="main"):
+        return self.scheduler.submit(job, session_id)
 
+    def send_message(self, text="", image_b64=None, on_delta=None,
+                     image_mime="image/png", cancel_event=None,
+                     session_id="main"):
 
-    def send_message(self, text="", image_b64=None, on_delta=None):
+        conv = self.session(session_id)
+        t_start = time.perf_counter()
+        system_prompt = load_system_prompt()
+
+        # 캐시: 같은 대화 흐름에서 같은 질문 + 같은 화면이면 저장된 답변 재생
+        cache_cfg = self.cache_config
+        key = fingerprint = qfp = None
+        if self.use_cache and cache_cfg["enabled"]:
+            fingerprint = image_fingerprint(image_b64)
+            if fingerprint is not None:
+                qfp = question_fp(text, fingerprint)
+                with conv.lock:
+                    history = list(conv.history)
+                key = cache_key(MODEL, system_prompt, history, text, qfp,
+                                cache_cfg, message_text)
+        cached = self.cache.get(key, fingerprint, cache_cfg) if key else None
+
+        # 0) 직전 캡처와 같은 이미지가 이미 대화에 있으면 다시 올리지 않음
+        if image_b64 and self._image_in_history(conv, image_b64, text):
+            text = (text + "\n" if text else "") + UNCHANGED_SCREEN_NOTE
+            image_b64 = None
 
         # 1) 사용자 메시지 만들기
         if image_b64:
@@ -33,7 +130,7 @@ class GPTClient:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": "data:image/png;base64," + image_b64
+                            "url": f"data:{image_mime};base64," + image_b64
                         }
                     }
                 ]
@@ -44,41 +141,140 @@ class GPTClient:
                 "content": text
             }
 
-        # 2) history 저장
-        self.history.append(user_message)
+        # 2) history 저장 (오래된 이미지는 축소/제거)
+        if qfp:
+            user_message["_fp"] = qfp
+        self._append_history(conv, user_message)
 
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
+        if cached is not None:
+            tracer.record("request_build", t_start, time.perf_counter(), session=session_id)
+            return self._replay(conv, cached, on_delta, cancel_event, cache_cfg, session_id)
 
-        # 3) 전체 메시지 준비
+        # 3) 전체 메시지 준비 (토큰 예산 안의 최근 대화 + 앞부분 요약)
+        #    같은 세션에서 동시에 진행 중인 답변은 끝난 뒤에 history 에 들어감
         messages = [
-            {"role": "system", "content": load_system_prompt()}
+            {"role": "system", "content": system_prompt}
         ]
-        messages += self.history
+        with conv.lock:
+            messages += build_context(list(conv.history), self.context)
+        t_request = time.perf_counter()
+        tracer.record("request_build", t_start, t_request, session=session_id)
 
-        # 4) GPT 스트리밍 요청
-        stream = self.client.chat.completions.create(
-            model="gpt-5.1",
-            messages=messages,
-            stream=True
+        # 4) GPT 스트리밍 요청 (첫 글자 전 오류는 자동 재시도)
+        stream = self.backend.open_stream(
+            MODEL, messages, cancel_event=cancel_event
         )
 
         # 5) 스트리밍 받기
+        with self._streams_lock:
+            self._streams.add(stream)
         full = ""
-        for chunk in stream:
-            if chunk.choices:
-                delta = chunk.choices[0].delta
-                if hasattr(delta, "content") and delta.content:
-                    full += delta.content
-                    if on_delta:
-                        on_delta(delta.content)
-
-        # 6) assistant 답변도 히스토리에 저장
-        self.history.append({
+        first = None
+        try:
+            for piece in stream:
+                if first is None:
+                    first = time.perf_counter()
+                    tracer.record("first_token", t_request, first, session=session_id)
+                full += piece
+                if on_delta:
+                    on_delta(piece)
+        finally:
+            with self._streams_lock:
+                self._streams.discard(stream)
+            tracer.record("stream", t_request, time.perf_counter(),
+                          session=session_id, chars=len(full),
+                          cancelled=stream.cancelled)
+
+        # 6) assistant 답변도 히스토리에 저장 (중단됐으면 표시를 붙여서)
+        self._append_history(conv, {
             "role": "assistant",
-            "content": full
+            "content": full + ("\n" + TRUNCATED_MARKER if stream.cancelled else "")
         })
-        if len(self.history) > self.max_history:
-            self.history = self.history[-self.max_history:]
+
+        if key and full and not stream.cancelled:
+            self.cache.put(key, fingerprint, full, cache_cfg)
 
         return full
+
+    # 캐시된 답변을 스트리밍과 같은 경로(on_delta)로 바로 흘려보냄
+    def _replay(self, conv, reply, on_delta, cancel_event, cache_cfg, session_id):
+        start = time.perf_counter()
+        chunk = max(1, int(cache_cfg["replay_chunk"]))
+        full = ""
+        cancelled = False
+        for i in range(0, len(reply), chunk):
+            if cancel_event is not None and cancel_event.is_set():
+                cancelled = True
+                break
+            piece = reply[i:i + chunk]
+            full += piece
+            if on_delta:
+                on_delta(piece)
+        tracer.record("cache_replay", start, time.perf_counter(),
+                      session=session_id, chars=len(full))
+
+        self._append_history(conv, {
+            "role": "assistant",
+            "content": full + ("\n" + TRUNCATED_MARKER if cancelled else "")
+        })
+        return full
+
+    # --------------------------------------------------------
+    # 진행 중인 답변 중단 (다른 스레드에서 호출 가능)
+    # cancel_event: 해당 요청만 (None 이면 전부)
+    # 연결을 바로 닫고, send_message 는 받은 데까지 반환한다.
+    # --------------------------------------------------------
+    def cancel(self, cancel_event=None):
+        if cancel_event is not None:
+            cancel_event.set()
+
+        with self._streams_lock:
+            streams = [s for s in self._streams
+                       if cancel_event is None or s.cancel_event is cancel_event]
+        for stream in streams:
+            stream.close()
+        return bool(streams)
+
+    # storage/context_settings.json (설정 서비스 캐시)
+    @property
+    def context(self):
+        return settings.get_with_defaults("context_settings", DEFAULT_CONTEXT_SETTINGS)
+
+    # storage/cache_settings.json
+    @property
+    def cache_config(self):
+        return settings.get_with_defaults("cache_settings", DEFAULT_CACHE_SETTINGS)
+
+    @property
+    def cache(self):
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = ResponseCache()
+            return self._cache
+
+    def _append_history(self, conv, message):
+        context = self.context
+        with conv.lock:
+            conv.history.append(message)
+            compact_images(
+                conv.history,
+                context["keep_images"],
+                context["old_image_max_edge"]
+            )
+            if len(conv.history) > context["max_messages"]:
+                del conv.history[:-context["max_messages"]]
+
+    # 같은 이미지가 아직 모델에 보낼 맥락(토큰 예산 안) 에 남아 있는지
+    def _image_in_history(self, conv, image_b64, text=""):
+        with conv.lock:
+            history = list(conv.history)
+        # 이번 질문도 예산을 쓰므로 넣어서 계산
+        count, _ = context_tail(history + [{"role": "user", "content": text}], self.context)
+        for msg in history[len(history) + 1 - count:]:
+            if not isinstance(msg["content"], list):
+                continue
+            for part in msg["content"]:
+                if part.get("type") == "image_url" and \
+                        part["image_url"]["url"].endswith(image_b64):
+                    return True
+        return False
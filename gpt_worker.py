@@ -0,0 +1,101 @@
+import base64
+
+from PySide6.QtCore import QObject, Signal
+
+from utils import log
+from ocr import ocr_prompt
+
+
+# ----------------------------------------------------------
+# GPT 요청 워커 (GPTClient 대기열에서 실행, 결과는 시그널로)
+# ----------------------------------------------------------
+class GPTWorker(QObject):
+    """
+    send_message 를 GPTClient 의 요청 스케줄러 스레드에서 실행하고
+    조각(delta)/완료/실패를 시그널로 GUI 스레드에 전달한다.
+    image_future 가 있으면 인코딩이 끝나는 즉시 요청을 보낸다.
+    """
+
+    started = Signal()             # 대기열에서 나와 실행 시작
+    delta = Signal(str)
+    completed = Signal(str, bool)   # (답변, 중단 여부)
+    failed = Signal(str)
+    image_ready = Signal(object)   # prepare_image 결과 + "ref"
+    image_failed = Signal(str)     # 이미지 준비 실패 (요청은 failed 로 끝남)
+    stopping = Signal()            # 중단 요청 즉시 (워커가 끝나기를 기다리지 않음)
+    finished = Signal()
+
+    def __init__(self, gpt, text="", image_b64=None, image_mime="image/png",
+                 image_future=None, image_store=None, session_id="main",
+                 parent=None):
+        super().__init__(parent)
+        self.gpt = gpt
+        self.text = text
+        self.image_b64 = image_b64
+        self.image_mime = image_mime
+        self.image_future = image_future
+        self.image_store = image_store
+        self.session_id = session_id
+        self.handle = None
+        self.stopped = False
+        self._ran = False
+
+    # 대기열에 넣기 (동시 실행 개수가 차 있으면 순서대로 대기)
+    def start(self):
+        self.handle = self.gpt.submit(self.run, self.session_id)
+        self.handle.future.add_done_callback(self._on_future_done)
+
+    # 대기 중에 취소되면 run() 이 불리지 않으므로 여기서 마무리
+    # 시작도 안 한 요청은 completed 를 보내지 않음 (기록에 남기지 않음)
+    def _on_future_done(self, future):
+        if not self._ran:
+            self.finished.emit()
+
+    def run(self, handle):
+        self._ran = True
+        try:
+            self.started.emit()
+            if self.image_future is not None:
+                self.wait_image()
+
+            full = self.gpt.send_message(
+                self.text, self.image_b64, on_delta=self.delta.emit,
+                image_mime=self.image_mime, cancel_event=handle.cancel_event,
+                session_id=self.session_id
+            )
+            self.completed.emit(full, handle.cancel_event.is_set())
+        except Exception as e:
+            log(f"[gpt_worker] ERROR: {e}")
+            self.failed.emit(str(e))
+        finally:
+            self.finished.emit()
+
+    # 중단 요청 (GUI 스레드에서 호출) → 대기 중이면 빼고, 진행 중이면 연결을 닫음
+    def cancel(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        if self.handle is not None:
+            self.handle.cancel()
+        self.stopping.emit()
+
+    # 인코딩 결과 대기 → 저장소에 기록 → GUI 에 알림
+    def wait_image(self):
+        try:
+            prepared = self.image_future.result()
+        except Exception as e:
+            self.image_failed.emit(str(e))
+            raise
+
+        prepared["ref"] = None
+        if self.image_store is not None:
+            prepared["ref"] = self.image_store.put_bytes(prepared["data"], prepared["ext"])
+
+        # OCR 글자가 있으면 질문에 붙이고, text 모드면 이미지는 보내지 않음
+        if prepared.get("ocr"):
+            self.text = ocr_prompt(self.text, prepared["ocr"]["text"])
+        self.image_b64 = None
+        if prepared.get("send_image", True):
+            self.image_b64 = base64.b64encode(prepared["data"]).decode()
+        self.image_mime = prepared["mime"]
+        self.image_ready.emit(prepared)
@@ -0,0 +1,211 @@
+import os
+import json
+import threading
+
+from utils import log, load_json
+from image_store import externalize_entry
+
+# 거꾸로 읽을 때 한 번에 읽는 크기
+BLOCK_SIZE = 64 * 1024
+
+
+# ----------------------------------------------------------
+# 대화 기록 저장소 (JSON Lines, append-only)
+# ----------------------------------------------------------
+class HistoryStore:
+    """
+    메시지 1개 = 한 줄(JSON). 저장은 파일 끝에 한 줄 추가만 하므로
+    기록이 아무리 길어져도 메시지당 비용이 일정하다.
+    이미지는 image_store 에 따로 저장하고 여기에는 "img_ref" 만 남긴다.
+    index(SearchIndex) 가 있으면 저장할 때 검색 색인도 같이 갱신한다.
+    """
+
+    def __init__(self, path="storage/chat_history.jsonl",
+                 legacy_path="storage/chat_history.json",
+                 image_store=None, index=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.image_store = image_store
+        self.index = index
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.migrate_legacy()
+        self._repair_tail()
+
+        # 색인에 빠진 부분(기존 기록, 변환된 legacy 등)은 백그라운드로 채움
+        if index is not None:
+            threading.Thread(
+                target=index.sync, args=(self,), name="search-sync", daemon=True
+            ).start()
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    # ------------------------------------------------------
+    # 메시지 1개 추가 (O(1)) → 파일 내 위치(offset) 반환
+    # ------------------------------------------------------
+    def append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            try:
+                with open(self.path, "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(line.encode("utf-8") + b"\n")
+                    end = f.tell()
+            except Exception as e:
+                log(f"[history_store] append ERROR: {e}")
+                return None
+
+            if self.index is not None:
+                self.index.add(offset, entry, end)
+        return offset
+
+    # ------------------------------------------------------
+    # 파일 끝에서부터 거꾸로 읽어 한 페이지만 불러오기
+    # before: 이 바이트 위치 이전의 메시지만 (None = 파일 끝)
+    # 반환: (시간 순 메시지 목록, 다음(더 오래된) 페이지 커서)
+    #       커서가 0 이면 더 불러올 메시지가 없음
+    # 각 메시지에는 파일 내 위치 "_offset" 이 붙는다.
+    # ------------------------------------------------------
+    def read_page(self, before=None, limit=50):
+        if not os.path.exists(self.path):
+            return [], 0
+
+        found = []
+        with open(self.path, "rb") as f:
+            end = f.seek(0, os.SEEK_END) if before is None else before
+            pos = end
+            tail = b""
+
+            while len(found) < limit and pos > 0:
+                step = min(BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+
+                # tail 의 끝에서부터 완성된 줄을 하나씩 떼어냄
+                while len(found) < limit:
+                    idx = tail.rfind(b"\n", 0, len(tail) - 1)
+                    if idx < 0:
+                        break
+                    self._collect(found, pos + idx + 1, tail[idx + 1:])
+                    tail = tail[:idx + 1]
+
+            # 파일 맨 앞까지 읽었으면 남은 것이 첫 줄
+            if pos == 0 and tail and len(found) < limit:
+                self._collect(found, 0, tail)
+                tail = b""
+
+        cursor = pos + len(tail)
+        found.reverse()
+        return found, cursor
+
+    # ------------------------------------------------------
+    # after 위치부터 앞으로 읽기 (검색 결과로 이동한 뒤 아래로 스크롤할 때)
+    # 반환: (시간 순 메시지 목록, 다음(더 최근) 페이지 커서)
+    #       커서가 size() 와 같으면 더 최근 메시지가 없음
+    # ------------------------------------------------------
+    def read_after(self, after=0, limit=50):
+        if not os.path.exists(self.path):
+            return [], 0
+
+        found = []
+        with open(self.path, "rb") as f:
+            f.seek(after)
+            pos = after
+            while len(found) < limit:
+                raw = f.readline()
+                if not raw.endswith(b"\n"):
+                    # 쓰는 중인 마지막 줄은 다음에
+                    break
+                self._collect(found, pos, raw)
+                pos += len(raw)
+        return found, pos
+
+    # (offset, entry, 줄 끝 위치) 를 start 부터 끝까지 (색인 재구성용)
+    def iter_entries(self, start=0):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            pos = start
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                found = []
+                self._collect(found, pos, raw)
+                pos += len(raw)
+                if found:
+                    yield found[0]["_offset"], found[0], pos
+
+    def _collect(self, found, offset, raw):
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            entry = json.loads(raw.decode("utf-8"))
+        except Exception:
+            log("[history_store] 손상된 줄 건너뜀")
+            return
+        entry["_offset"] = offset
+        found.append(self._externalize(entry))
+
+    def _externalize(self, entry):
+        if self.image_store is not None and entry.get("img"):
+            externalize_entry(entry, self.image_store)
+        return entry
+
+    # ------------------------------------------------------
+    # 마지막 줄이 잘려 있으면 줄바꿈으로 닫아줌
+    # (다음 append 가 잘린 줄에 이어 붙지 않도록)
+    # ------------------------------------------------------
+    def _repair_tail(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        try:
+            with open(self.path, "rb+") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        except Exception as e:
+            log(f"[history_store] repair ERROR: {e}")
+
+    # ------------------------------------------------------
+    # 기존 chat_history.json (JSON 배열) → JSONL 1회 변환
+    # ------------------------------------------------------
+    def migrate_legacy(self):
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+
+        # 이미 변환된 기록이 있으면 덮어쓰지 않음
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            return
+
+        history = load_json(self.legacy_path)
+        if not isinstance(history, list):
+            log("[history_store] legacy 형식이 아님 → 변환 생략")
+            return
+
+        history.sort(key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in history:
+                    entry = self._externalize(entry)
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+                    f.write("\n")
+            os.replace(tmp_path, self.path)
+
+            # 원본은 지우지 않고 이름만 바꿔 보관
+            os.replace(self.legacy_path, self.legacy_path + ".migrated")
+            log(f"[history_store] {len(history)}개 메시지 변환 완료")
+        except Exception as e:
+            log(f"[history_store] migrate ERROR: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
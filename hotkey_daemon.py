@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+from utils import log
+from settings import with_defaults
+from tracing import span
+from capture_engine import capture_full_screen, mode_bbox
+from image_pipeline import image_settings, prepare_image_async
+
+
+# ----------------------------------------------------------
+# 전역 단축키 기본값 (storage/hotkey_settings.json)
+# 키 표기는 pynput 형식: "<ctrl>+<alt>+<space>", "<ctrl>+<shift>+q" ...
+# ----------------------------------------------------------
+DEFAULT_HOTKEY_SETTINGS = {
+    "enabled": True,
+    "ask": "<ctrl>+<alt>+<space>",  # 찍어서 바로 질문
+    "queue": "<ctrl>+<alt>+q",      # 찍어 두고 다음 Enter 질문에 붙임
+    "mode": "window",               # full | window (활성 창) | monitor (커서 모니터)
+    "ask_text": "",                 # 바로 질문할 때 같이 보낼 글 (빈 칸 = 이미지만)
+}
+
+HOTKEY_MODES = ("full", "window", "monitor")
+
+
+def hotkey_settings(cfg=None):
+    settings = with_defaults(DEFAULT_HOTKEY_SETTINGS, cfg)
+    if settings["mode"] not in HOTKEY_MODES:
+        log(f"[hotkey_daemon] 알 수 없는 캡처 범위: {settings['mode']} → window")
+        settings["mode"] = "window"
+    return settings
+
+
+# ----------------------------------------------------------
+# 전역 단축키 → 캡처 (pynput, 다른 앱을 쓰는 중에도 동작)
+# ----------------------------------------------------------
+class HotkeyDaemon(QObject):
+    """
+    pynput 리스너 스레드는 키 입력 훅이라 바로 돌려주고,
+    캡처는 전용 스레드 1개, 전처리/인코딩은 image_pipeline 작업 풀에서 한다.
+    창을 앞으로 가져오거나 숨겼다 보이지 않는다
+    (캡처 제외가 안 되는 환경이면 앱 창이 같이 찍힐 수 있음).
+    captured(action, 원본 PIL 이미지, 인코딩 Future) 는 GUI 스레드에서 받는다.
+    action: "ask" | "queue"
+    """
+
+    captured = Signal(str, object, object)
+
+    def __init__(self, capture_settings=None, parent=None):
+        super().__init__(parent)
+        # 캡처 설정은 호출할 때마다 다시 읽음 (설정 파일이 바뀌면 반영)
+        self.capture_settings = capture_settings or (lambda: {})
+        self.settings = hotkey_settings()
+        self._listener = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hotkey-capture")
+
+    # ------------------------------------------------------
+    # 시작 / 중지 (pynput 이 없거나 훅을 못 걸면 False)
+    # ------------------------------------------------------
+    def start(self, cfg=None):
+        self.stop()
+        self.settings = hotkey_settings(cfg)
+        if not self.settings["enabled"]:
+            return False
+
+        try:
+            from pynput import keyboard
+        except Exception as e:
+            log(f"[hotkey_daemon] pynput 사용 불가 ({e}) → 전역 단축키 끔")
+            return False
+
+        try:
+            self._listener = keyboard.GlobalHotKeys({
+                self.settings["ask"]: lambda: self._trigger("ask"),
+                self.settings["queue"]: lambda: self._trigger("queue"),
+            })
+            self._listener.daemon = True
+            self._listener.start()
+        except Exception as e:
+            log(f"[hotkey_daemon] 단축키 등록 실패: {e}")
+            self._listener = None
+            return False
+
+        log(f"[hotkey_daemon] ask={self.settings['ask']} queue={self.settings['queue']} "
+            f"mode={self.settings['mode']}")
+        return True
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def shutdown(self):
+        self.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # 키 훅 스레드: 캡처 스레드에 넘기고 바로 돌아감
+    def _trigger(self, action):
+        self._executor.submit(self._capture, action)
+
+    # ------------------------------------------------------
+    # 캡처 스레드: 찍기 → 인코딩 시작 → GUI 로 전달
+    # ------------------------------------------------------
+    def _capture(self, action):
+        try:
+            with span("hotkey_capture", action=action, mode=self.settings["mode"]):
+                bbox = mode_bbox(self.settings["mode"])
+                img = capture_full_screen(bbox=bbox)
+                if img is None:
+                    return
+                # crop: monitor 는 앱 창 기준이라 여기서는 쓰지 않음
+                future = prepare_image_async(img, image_settings(self.capture_settings()))
+        except Exception as e:
+            log(f"[hotkey_daemon] capture ERROR: {e}")
+            return
+        self.captured.emit(action, img, future)
@@ -0,0 +1,199 @@
+import io
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from utils import log
+from settings import with_defaults
+from tracing import tracer, span
+from ocr import run_ocr
+
+
+# ----------------------------------------------------------
+# 업로드 전 이미지 전처리 기본값 (storage/capture_settings.json)
+# ----------------------------------------------------------
+DEFAULT_IMAGE_SETTINGS = {
+    "max_edge": 2048,      # 긴 변 최대 픽셀 (0 = 원본 크기)
+    "crop": "full",        # full | monitor (앱 창이 있는 모니터만)
+    "format": "jpeg",      # png | jpeg | webp
+    "quality": 85,         # jpeg / webp 품질
+    "grayscale": False,    # 글자 위주 화면이면 흑백으로
+    "diff_mode": "off",    # off | reuse (변화 없으면 이전 캡처 재사용) | region (바뀐 부분만)
+    "region_max_ratio": 0.25,  # region 모드: 바뀐 타일 비율이 이 이하일 때만 잘라 보냄
+    "ocr": "off",          # off | text (글자만 전송) | text+image (글자 + 작은 이미지)
+    "ocr_engine": "auto",  # auto | winsdk | tesseract
+    "ocr_lang": "kor+eng", # tesseract 언어
+    "ocr_image_max_edge": 1024,  # OCR 을 쓸 때 이미지 긴 변 (text 모드는 기록용)
+    "ocr_min_chars": 40,   # 글자가 이보다 적으면 OCR 을 쓰지 않고 이미지 그대로
+}
+
+OCR_MODES = ("off", "text", "text+image")
+
+# 말풍선 썸네일 폭 (thumb_cache 와 같은 값)
+THUMB_WIDTH = 180
+
+FORMATS = {
+    "png": ("PNG", "image/png", "png"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+}
+
+
+def image_settings(cfg=None):
+    settings = with_defaults(DEFAULT_IMAGE_SETTINGS, cfg)
+    if settings["format"] not in FORMATS:
+        log(f"[image_pipeline] 알 수 없는 형식: {settings['format']} → png")
+        settings["format"] = "png"
+    if settings["ocr"] not in OCR_MODES:
+        log(f"[image_pipeline] 알 수 없는 ocr 모드: {settings['ocr']} → off")
+        settings["ocr"] = "off"
+    return settings
+
+
+# ----------------------------------------------------------
+# 자르기 → 흑백 → 축소
+# crop_box: (left, top, right, bottom) 캡처 이미지 좌표
+# ----------------------------------------------------------
+def preprocess_image(img, settings, crop_box=None):
+    meta = {"src_size": list(img.size)}
+
+    if crop_box:
+        img = img.crop(crop_box)
+        meta["crop"] = list(crop_box)
+
+    if settings["grayscale"]:
+        img = img.convert("L")
+        meta["grayscale"] = True
+
+    max_edge = int(settings["max_edge"] or 0)
+    w, h = img.size
+    if max_edge and max(w, h) > max_edge:
+        scale = max_edge / max(w, h)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        # reducing_gap: 먼저 정수 배율로 빠르게 줄인 뒤 LANCZOS
+        img = img.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+    meta["size"] = list(img.size)
+    return img, meta
+
+
+# ----------------------------------------------------------
+# 인코딩 → (바이트, mime, 확장자, meta)
+# base64 는 API 로 보낼 때만 만든다 (저장은 바이트 그대로)
+# ----------------------------------------------------------
+def encode_image(img, settings):
+    pil_format, mime, ext = FORMATS[settings["format"]]
+
+    if pil_format != "PNG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    options = {}
+    if pil_format == "JPEG":
+        options = {"quality": int(settings["quality"])}
+    elif pil_format == "WEBP":
+        options = {"quality": int(settings["quality"]), "method": 2}
+    else:
+        options = {"compress_level": 3}
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=pil_format, **options)
+    data = buffer.getvalue()
+
+    meta = {"format": settings["format"], "bytes": len(data)}
+    if pil_format != "PNG":
+        meta["quality"] = int(settings["quality"])
+
+    return data, mime, ext, meta
+
+
+# ----------------------------------------------------------
+# 말풍선 썸네일 (PIL, RGB, 폭 width 이하)
+# 먼저 줄이고 나서 형식 변환 (원본 크기의 사본을 만들지 않음)
+# ----------------------------------------------------------
+def make_thumbnail(img, width=THUMB_WIDTH):
+    if img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGB")
+    if img.width > width:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.BICUBIC, reducing_gap=3.0)
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+
+# ----------------------------------------------------------
+# (OCR) + 전처리 + 인코딩 + 썸네일 한 번에
+# 반환: {"data", "mime", "ext", "meta", "ocr", "send_image", "thumb"}
+#   data:       인코딩된 이미지 바이트 (저장소에 그대로 기록)
+#   ocr:        OCR 결과 (안 했거나 글자가 적으면 None)
+#   thumb:      저장된 그림의 말풍선 썸네일 (PIL, 다시 불러왔을 때와 같은 그림)
+#   send_image: False 면 이미지는 기록용으로만 저장하고 모델에는 글자만 보냄
+# ----------------------------------------------------------
+def prepare_image(img, settings, crop_box=None):
+    ocr = None
+    if settings["ocr"] != "off":
+        # 축소 전 원본 해상도에서 읽어야 작은 글자도 잡힘
+        ocr = run_ocr(img.crop(crop_box) if crop_box else img, settings)
+        if ocr is not None and len(ocr["text"].strip()) < settings["ocr_min_chars"]:
+            ocr = None
+        # 글자를 읽었으면 큰 이미지는 필요 없음
+        # (text+image 는 작은 이미지를 같이 보내고, text 는 기록용으로만 작게 저장)
+        if ocr is not None:
+            settings = dict(settings, max_edge=settings["ocr_image_max_edge"])
+
+    start = time.perf_counter()
+
+    img, meta = preprocess_image(img, settings, crop_box)
+    data, mime, ext, enc_meta = encode_image(img, settings)
+    meta.update(enc_meta)
+
+    end = time.perf_counter()
+    meta["encode_ms"] = round((end - start) * 1000, 1)
+    tracer.record("encode", start, end, format=meta.get("format"), bytes=meta.get("bytes"))
+
+    with span("thumbnail", ref="new"):
+        thumb = make_thumbnail(img)
+
+    send_image = True
+    if ocr is not None:
+        send_image = settings["ocr"] == "text+image"
+        meta["ocr"] = {"engine": ocr["engine"], "chars": len(ocr["text"]),
+                       "ms": ocr["ms"], "mode": settings["ocr"]}
+    log(f"[image_pipeline] {meta}")
+
+    return {"data": data, "mime": mime, "ext": ext, "meta": meta,
+            "ocr": ocr, "send_image": send_image, "thumb": thumb}
+
+
+# ----------------------------------------------------------
+# 인코딩 작업 풀 (GUI 스레드 밖에서 전처리 + 인코딩)
+# PIL 의 resize / 압축은 GIL 을 풀고 돌기 때문에 스레드로 충분하고,
+# 수십 MB 캡처를 프로세스로 복사(pickle)하는 비용도 없다.
+# ----------------------------------------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def encode_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = min(4, os.cpu_count() or 1)
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="image-encode"
+            )
+        return _executor
+
+
+# 앱 종료: 대기 중인 작업은 버리고 스레드가 종료를 막지 않게
+def shutdown_encoder():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+# prepare_image 를 풀에서 실행 → concurrent.futures.Future 반환
+def prepare_image_async(img, settings, crop_box=None):
+    return encode_executor().submit(prepare_image, img, settings, crop_box)
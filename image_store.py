@@ -0,0 +1,101 @@
+import os
+import io
+import base64
+import hashlib
+
+from PIL import Image
+from utils import log
+
+
+# ----------------------------------------------------------
+# 이미지 저장소 (내용 해시 기반, 중복 제거)
+# ----------------------------------------------------------
+class ImageStore:
+    """
+    이미지를 storage/images/<sha256>.<ext> 바이너리 파일로 한 번만 저장하고
+    대화 기록에는 파일 이름(ref)만 남긴다.
+    같은 화면을 여러 번 캡처해도 파일은 하나.
+    """
+
+    def __init__(self, root="storage/images"):
+        self.root = root
+
+    def path(self, ref):
+        return os.path.join(self.root, ref)
+
+    def exists(self, ref):
+        return bool(ref) and os.path.exists(self.path(ref))
+
+    # ------------------------------------------------------
+    # 저장 → ref 반환
+    # ------------------------------------------------------
+    def put_bytes(self, data, ext="png"):
+        ref = hashlib.sha256(data).hexdigest() + "." + ext
+        path = self.path(ref)
+        if os.path.exists(path):
+            return ref
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            log(f"[image_store] put ERROR: {e}")
+            return None
+        return ref
+
+    def put_b64(self, b64, ext="png"):
+        if not b64:
+            return None
+        try:
+            data = base64.b64decode(b64)
+        except Exception as e:
+            log(f"[image_store] base64 ERROR: {e}")
+            return None
+        return self.put_bytes(data, ext)
+
+    # ------------------------------------------------------
+    # 불러오기 (필요할 때만 디스크에서 읽음)
+    # ------------------------------------------------------
+    def read_bytes(self, ref):
+        if not self.exists(ref):
+            return None
+        try:
+            with open(self.path(ref), "rb") as f:
+                return f.read()
+        except Exception as e:
+            log(f"[image_store] read ERROR: {e}")
+            return None
+
+    # 원본 크기 (헤더만 읽고 디코딩하지 않음)
+    def image_size(self, ref):
+        if not self.exists(ref):
+            return None
+        try:
+            with Image.open(self.path(ref)) as img:
+                return img.size
+        except Exception as e:
+            log(f"[image_store] size ERROR: {e}")
+            return None
+
+    def load_image(self, ref):
+        data = self.read_bytes(ref)
+        if data is None:
+            return None
+        try:
+            return Image.open(io.BytesIO(data)).convert("RGB")
+        except Exception as e:
+            log(f"[image_store] decode ERROR: {e}")
+            return None
+
+
+# ----------------------------------------------------------
+# 기록 항목의 인라인 base64("img") → ref("img_ref") 변환
+# ----------------------------------------------------------
+def externalize_entry(entry, store):
+    img_b64 = entry.pop("img", None)
+    if img_b64 and not entry.get("img_ref"):
+        entry["img_ref"] = store.put_b64(img_b64)
+    return entry
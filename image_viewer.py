@@ -0,0 +1,264 @@
+from PIL import Image
+from PySide6.QtCore import Qt, QObject, Signal, QRectF, QTimer
+from PySide6.QtGui import QPainter, QColor
+from PySide6.QtWidgets import (
+    QApplication, QDialog, QVBoxLayout,
+    QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
+)
+
+from utils import log, ImageBuffer
+from tracing import span
+from image_pipeline import encode_executor
+
+
+# 타일 한 변(px) / 축소 화면용 미리보기 최대 변(px)
+TILE_SIZE = 1024
+OVERVIEW_EDGE = 2048
+
+# 마우스를 이 거리(px) 안에서 떼면 클릭으로 보고 창을 닫음
+CLICK_SLOP = 4
+
+
+# ----------------------------------------------------------
+# 원본 디코딩 + 타일 나누기 (작업 풀 스레드)
+# 픽셀은 ImageBuffer 로 넘기고 QPixmap 은 GUI 스레드에서 만든다.
+# ----------------------------------------------------------
+def build_tiles(img, tile=TILE_SIZE, overview_edge=OVERVIEW_EDGE):
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    overview = img
+    if max(img.size) > overview_edge:
+        overview = img.copy()
+        overview.thumbnail((overview_edge, overview_edge), Image.BILINEAR, reducing_gap=3.0)
+
+    tiles = []
+    if overview is not img:
+        for top in range(0, img.height, tile):
+            for left in range(0, img.width, tile):
+                part = img.crop((left, top, min(left + tile, img.width),
+                                 min(top + tile, img.height)))
+                tiles.append((left, top, ImageBuffer.from_pil(part)))
+
+    return {"size": img.size, "overview": ImageBuffer.from_pil(overview), "tiles": tiles}
+
+
+class _TileLoader(QObject):
+    loaded = Signal(object)
+    failed = Signal(str)
+
+
+# ----------------------------------------------------------
+# 이미지 뷰어
+# ----------------------------------------------------------
+class ImageViewerDialog(QDialog):
+    """
+    preview(썸네일)로 바로 열고, 원본은 작업 풀에서 디코딩해 타일로 교체한다.
+    - size:   원본 크기 (w, h). 없으면 preview 크기
+    - loader: 원본 PIL 이미지를 돌려주는 함수 (작업 풀에서 호출)
+    휠: 확대/축소, 드래그: 이동, 더블클릭: 화면에 맞춤, 클릭/Esc: 닫기
+    원본 타일의 QPixmap 은 확대해서 화면에 보이는 타일만 만들고,
+    화면에서 멀어진 타일은 놓는다. 닫으면 창과 함께 모두 지워진다.
+    """
+
+    def __init__(self, preview, size=None, loader=None, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+
+        # ---- 1) 타이틀바 삭제 + 완전한 프레임리스 ----
+        self.setWindowFlags(
+            Qt.FramelessWindowHint |
+            Qt.WindowStaysOnTopHint |
+            Qt.Popup
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+
+        if size is None:
+            size = (preview.width(), preview.height())
+        self.full_w, self.full_h = size
+
+        # ---- 2) 장면: 원본 좌표계, 처음엔 미리보기를 원본 크기로 늘려 표시 ----
+        self.scene = QGraphicsScene(self)
+        self.scene.setSceneRect(QRectF(0, 0, self.full_w, self.full_h))
+
+        self.preview_item = self._add_item(preview, 0, 0, self.full_w / max(1, preview.width()))
+        self.overview_item = None
+        # [left, top, ImageBuffer, 장면 item (안 만들었으면 None)]
+        self.tiles = []
+
+        self.view = _ZoomView(self.scene, self)
+        self.view.zoomed.connect(self._update_detail)
+        self.view.clicked.connect(self.close)
+        # 끌어서 이동할 때도 새로 보이는 타일 채우기
+        self.view.horizontalScrollBar().valueChanged.connect(self._update_detail)
+        self.view.verticalScrollBar().valueChanged.connect(self._update_detail)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.view)
+
+        # ---- 3) 화면 80% 안에 맞춘 창 크기, 화면 정중앙 ----
+        screen = QApplication.primaryScreen().availableGeometry()
+        scale = min(1.0, screen.width() * 0.8 / self.full_w,
+                    screen.height() * 0.8 / self.full_h)
+        self.resize(max(1, int(self.full_w * scale)), max(1, int(self.full_h * scale)))
+        self.move(
+            screen.x() + (screen.width() - self.width()) // 2,
+            screen.y() + (screen.height() - self.height()) // 2
+        )
+
+        # ---- 4) 원본은 백그라운드에서 ----
+        self._loader = None
+        if loader is not None:
+            self._start_loading(loader)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.view.fit()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.close()
+            return
+        super().keyPressEvent(event)
+
+    # ------------------------------------------------------
+    # 원본 불러오기
+    # ------------------------------------------------------
+    def _start_loading(self, loader):
+        self._loader = _TileLoader()
+        self._loader.loaded.connect(self._on_loaded)
+        self._loader.failed.connect(lambda err: log(f"[image_viewer] {err}"))
+        emitter = self._loader
+
+        def job():
+            try:
+                with span("viewer_decode"):
+                    img = loader()
+                    if img is None:
+                        emitter.failed.emit("원본 이미지를 읽지 못함")
+                        return
+                    emitter.loaded.emit(build_tiles(img))
+            except Exception as e:
+                emitter.failed.emit(f"load ERROR: {e}")
+
+        encode_executor().submit(job)
+
+    def _on_loaded(self, result):
+        with span("viewer_tiles", tiles=len(result["tiles"])):
+            w, h = result["size"]
+            if (w, h) != (self.full_w, self.full_h):
+                # 크기 정보가 달랐으면 장면을 원본에 맞춤
+                self.full_w, self.full_h = w, h
+                self.scene.setSceneRect(QRectF(0, 0, w, h))
+                self.preview_item.setScale(w / max(1, self.preview_item.pixmap().width()))
+                self.view.fit()
+
+            overview = result["overview"].to_qpixmap()
+            self.overview_item = self._add_item(overview, 0, 0, w / max(1, overview.width()))
+            self.overview_item.setZValue(1)
+
+            # 타일은 픽셀만 들고 있다가 보일 때 QPixmap 으로
+            self.tiles = [[left, top, buf, None] for left, top, buf in result["tiles"]]
+
+            self.preview_item.setVisible(False)
+            self._update_detail()
+
+    def _add_item(self, pixmap, x, y, scale):
+        item = QGraphicsPixmapItem(pixmap)
+        item.setTransformationMode(Qt.SmoothTransformation)
+        item.setPos(x, y)
+        item.setScale(scale)
+        self.scene.addItem(item)
+        return item
+
+    # 축소해서 볼 때는 미리보기 한 장, 확대하면 화면에 보이는 원본 타일만
+    def _update_detail(self):
+        if self.overview_item is None or not self.tiles:
+            return
+        shown_w = self.full_w * self.view.transform().m11()
+        detail = shown_w > self.overview_item.pixmap().width()
+
+        visible = QRectF()
+        if detail:
+            visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+            # 이동할 때 빈 칸이 보이지 않게 타일 하나만큼 여유
+            visible.adjust(-TILE_SIZE, -TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+        for tile in self.tiles:
+            left, top, buf, item = tile
+            near = detail and visible.intersects(QRectF(left, top, buf.width, buf.height))
+            if near and item is None:
+                with span("viewer_tile_pixmap"):
+                    item = self._add_item(buf.to_qpixmap(), left, top, 1.0)
+                item.setZValue(2)
+                tile[3] = item
+            elif not near and item is not None:
+                self.scene.removeItem(item)
+                tile[3] = None
+
+
+# ----------------------------------------------------------
+# 휠 확대/축소 + 드래그 이동 뷰
+# ----------------------------------------------------------
+class _ZoomView(QGraphicsView):
+    zoomed = Signal()
+    clicked = Signal()
+
+    MAX_ZOOM = 8.0
+
+    def __init__(self, scene, parent=None):
+        super().__init__(scene, parent)
+        self.setRenderHints(QPainter.SmoothPixmapTransform)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setBackgroundBrush(QColor(0, 0, 0, 200))
+        self.setFrameShape(QGraphicsView.NoFrame)
+        self._press_pos = None
+
+        # 더블클릭과 구분하려고 클릭은 조금 늦게 처리
+        self._click_timer = QTimer(self)
+        self._click_timer.setSingleShot(True)
+        self._click_timer.setInterval(QApplication.doubleClickInterval())
+        self._click_timer.timeout.connect(self.clicked)
+
+    def fit(self):
+        self.fitInView(self.sceneRect(), Qt.KeepAspectRatio)
+        self.zoomed.emit()
+
+    def fit_scale(self):
+        rect = self.sceneRect()
+        if rect.width() <= 0 or rect.height() <= 0:
+            return 1.0
+        return min(self.viewport().width() / rect.width(),
+                   self.viewport().height() / rect.height())
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if not steps:
+            return
+        factor = 1.25 ** steps
+        current = self.transform().m11()
+        target = max(self.fit_scale(), min(self.MAX_ZOOM, current * factor))
+        if target != current:
+            self.scale(target / current, target / current)
+            self.zoomed.emit()
+
+    def mouseDoubleClickEvent(self, event):
+        self._click_timer.stop()
+        self._press_pos = None
+        self.fit()
+
+    def mousePressEvent(self, event):
+        self._press_pos = event.position()
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        if self._press_pos is not None and event.button() == Qt.LeftButton:
+            moved = (event.position() - self._press_pos).manhattanLength()
+            if moved <= CLICK_SLOP:
+                self._click_timer.start()
+        self._press_pos = None
@@ -1,29 +1,62 @@
 import sys
 import os
-import json
+import time
+import threading
+from concurrent.futures import Future
 
 from PySide6.QtWidgets import ( # type: ignore
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QTextEdit, QPushButton, QScrollArea, QDialog,
-    QLineEdit, QSizePolicy
+    QLineEdit, QSizePolicy, QTableWidget, QTableWidgetItem, QHeaderView,
+    QListWidget, QListWidgetItem
 )
 from PySide6.QtCore import Qt, QEvent, QPropertyAnimation
-from PySide6.QtGui import QPixmap, QImage, QTextOption
+from PySide6.QtGui import QTextOption, QTextCursor, QIcon
 
 from gpt_client import GPTClient
-from capture_engine import capture_full_screen
+from gpt_worker import GPTWorker
+from stream_renderer import StreamRenderer
+from capture_engine import (
+    capture_full_screen, set_backend,
+    exclude_window_from_capture, window_hidden, mode_bbox
+)
+from region_select import RegionSelector
+from hotkey_daemon import HotkeyDaemon
+from history_store import HistoryStore
+from search_index import SearchIndex
+from image_store import ImageStore
+from thumb_cache import ThumbCache, pil_to_pixmap, placeholder_pixmap
+from image_viewer import ImageViewerDialog
+from image_pipeline import (
+    image_settings, prepare_image, prepare_image_async, encode_executor,
+    encode_image, make_thumbnail, shutdown_encoder
+)
+from frame_diff import FrameDiff
+from settings import settings
+from tracing import tracer, span
 from utils import (
-    save_json, load_json, now_timestamp,
-    image_to_base64, base64_to_image
+    now_timestamp,
+    base64_to_image, log, ImageBuffer
 )
 import ctypes
 from ctypes import wintypes
 
-from PySide6.QtGui import QPixmap, QImage, QTextOption, QIcon
 from PySide6.QtCore import QTimer
 
-from PIL import Image
 
+# 중단된 답변 끝에 표시
+STOPPED_MARKER = "[stopped]"
+
+# 캡처 이미지를 준비하지 못한 질문에 표시
+IMAGE_FAILED_MARKER = "[image failed]"
+
+# 캡처 범위 / Ctrl+Shift+키 → 범위
+CAPTURE_MODES = ("full", "window", "monitor", "region")
+CAPTURE_HOTKEYS = {
+    Qt.Key_W: "window",
+    Qt.Key_M: "monitor",
+    Qt.Key_R: "region",
+}
 
 DEFAULT_SYSTEM_PROMPT = """Explain the key points in an easy way using analogies and examples. Respond in the user’s language.
 """
@@ -37,7 +70,7 @@ class SystemPromptDialog(QDialog):
         layout = QVBoxLayout()
 
         self.edit = QTextEdit()
-        saved = load_json("storage/system_prompt.json")
+        saved = settings.get("system_prompt")
         if not saved or saved.strip() == "":
             saved = DEFAULT_SYSTEM_PROMPT
         self.edit.setPlainText(saved)
@@ -52,7 +85,7 @@ class SystemPromptDialog(QDialog):
 
     def save_prompt(self):
         text = self.edit.toPlainText()
-        save_json("storage/system_prompt.json", text)
+        settings.set("system_prompt", text)   # 캐시 갱신 → 다음 요청부터 반영
         self.accept()
 
 
@@ -97,6 +130,33 @@ def format_date(date_str):
     y, m, d = date_str.split("-")
     return f"{y}-{m}-{d}"
 
+
+# --------------------------------------------------------
+# 캡처 영역 유틸 (left, top, right, bottom)
+# --------------------------------------------------------
+def pad_box(box, pad, size):
+    l, t, r, b = box
+    w, h = size
+    return (max(0, l - pad), max(0, t - pad), min(w, r + pad), min(h, b + pad))
+
+def intersect_box(box, other):
+    if other is None:
+        return box
+    l = max(box[0], other[0])
+    t = max(box[1], other[1])
+    r = min(box[2], other[2])
+    b = min(box[3], other[3])
+    if r <= l or b <= t:
+        return other
+    return (l, t, r, b)
+
+
+# 이전 인코딩 결과를 그대로 씀 (meta 에 reused 표시)
+def reused_result(prepared):
+    prepared = dict(prepared)
+    prepared["meta"] = dict(prepared["meta"], reused=True)
+    return prepared
+
 #--------------------------
 # 이미지 붙여넣기 기능
 #--------------------------
@@ -131,17 +191,73 @@ class ApiKeyDialog(QDialog):
         layout.addWidget(btn)
         self.setLayout(layout)
 
-        data = load_json("storage/api_key.json")
+        data = settings.get("api_key")
         if data and "api_key" in data:
             self.edit.setText(data["api_key"])
 
     def save_key(self):
         key = self.edit.text().strip()
         if key:
-            save_json("storage/api_key.json", {"api_key": key})
+            settings.set("api_key", {"api_key": key})
             self.accept()
 
 
+# --------------------------------------------------------
+# 진단 패널 (Ctrl+D): 단계별 소요 시간 p50 / p95
+# --------------------------------------------------------
+class DiagnosticsDialog(QDialog):
+    COLUMNS = ["span", "count", "last ms", "p50 ms", "p95 ms", "max ms"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(520, 360)
+
+        layout = QVBoxLayout()
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        path = os.path.abspath(tracer.path) if tracer.enabled else "(off)"
+        self.path_label = QLabel(f"trace: {path}")
+        self.path_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.path_label.setStyleSheet("color:#555; font-size:11px;")
+        layout.addWidget(self.path_label)
+
+        self.setLayout(layout)
+
+        # 열려 있는 동안만 1초마다 갱신 (닫으면 멈춤)
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        summary = tracer.summary()
+        self.table.setRowCount(len(summary))
+        for row, name in enumerate(sorted(summary)):
+            s = summary[name]
+            values = [name, str(s["count"])] + \
+                [f"{s[k]:.1f}" for k in ("last", "p50", "p95", "max")]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
+
+
 # --------------------------------------------------------
 # 날짜 구분선
 # --------------------------------------------------------
@@ -165,63 +281,20 @@ class DateSeparator(QWidget):
 
 
 
-class ImageViewerDialog(QDialog):
-    def __init__(self, pixmap, parent=None):
-        super().__init__(parent)
-
-        # ---- 1) 타이틀바 삭제 + 완전한 프레임리스 ----
-        self.setWindowFlags(
-            Qt.FramelessWindowHint |
-            Qt.WindowStaysOnTopHint |
-            Qt.Popup
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
-
-        # ---- 2) 화면 크기 기준 축소 ----
-        screen = QApplication.primaryScreen().availableGeometry()
-        max_w = int(screen.width() * 0.8)
-        max_h = int(screen.height() * 0.8)
-
-        w = pixmap.width()
-        h = pixmap.height()
-
-        if w > max_w or h > max_h:
-            pixmap = pixmap.scaled(
-                max_w, max_h,
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-
-        # ---- 3) 이미지 표시 QLabel (배경 없음) ----
-        lbl = QLabel(self)
-        lbl.setPixmap(pixmap)
-        lbl.setAlignment(Qt.AlignCenter)
-        lbl.setStyleSheet("background: transparent;")
-
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.addWidget(lbl)
-
-        # 창 크기를 이미지에 맞춤
-        self.resize(pixmap.width(), pixmap.height())
-
-        # ---- 4) 화면 정중앙에 창 배치 ----
-        center_x = screen.x() + (screen.width() - self.width()) // 2
-        center_y = screen.y() + (screen.height() - self.height()) // 2
-        self.move(center_x, center_y)
-
-    # 클릭하면 닫힘
-    def mousePressEvent(self, event):
-        self.close()
-
-
 # --------------------------------------------------------
 # 말풍선
 # --------------------------------------------------------
 class ChatBubble(QWidget):
-    def __init__(self, text="", is_user=False, image_b64=None, timestamp=""):
+    def __init__(self, text="", is_user=False, image_b64=None, timestamp="",
+                 image_ref=None, thumbs=None, image=None):
         super().__init__()
 
+        # 원본은 들고 있지 않고 뷰어를 열 때 불러옴
+        # (방금 캡처한 이미지는 저장소에 기록될 때까지만 보관)
+        self.image_ref = image_ref
+        self.thumbs = thumbs
+        self._pending_image = None
+
         outer = QVBoxLayout()
         outer.setContentsMargins(0, 0, 0, 0)
         outer.setSpacing(3)
@@ -248,22 +321,29 @@ class ChatBubble(QWidget):
         self.text_label.setText(text or "")
         bubble_layout.addWidget(self.text_label)
 
-        # ----- 이미지 영역 -----
-        if image_b64:
-            img = base64_to_image(image_b64)
-            qimg = QImage(img.tobytes(), img.width, img.height, QImage.Format_RGB888)
-            pix = QPixmap.fromImage(qimg).scaledToWidth(180, Qt.SmoothTransformation)
+        # ----- 이미지 영역 (썸네일만) -----
+        self.thumb = None
+        if image is not None:
+            # 방금 캡처한 PIL 이미지 (인코딩을 기다리지 않음)
+            # 썸네일은 작업 풀에서 만들어 set_image_ref 로 받음 → 그때까지 빈 자리
+            self._pending_image = image
+            self.thumb = placeholder_pixmap(image.size)
+        elif image_b64:
+            self.thumb = pil_to_pixmap(make_thumbnail(base64_to_image(image_b64)))
+        elif image_ref and thumbs is not None:
+            # 기록에는 ref 만 있음 → 썸네일 캐시 (없으면 원본에서 한 번 생성)
+            self.thumb = thumbs.get(image_ref)
+
+        self.image_label = None
+        if self.thumb is not None:
             img_lbl = QLabel()
-            img_lbl.setPixmap(pix)
+            self.image_label = img_lbl
+            img_lbl.setPixmap(self.thumb)
             img_lbl.setStyleSheet("background: transparent;")
             img_lbl.setCursor(Qt.PointingHandCursor)   # 손 모양 커서
 
             # 클릭 이벤트 연결
-            def open_viewer():
-                dlg = ImageViewerDialog(QPixmap.fromImage(qimg), self)
-                dlg.exec()
-
-            img_lbl.mousePressEvent = lambda e: open_viewer()
+            img_lbl.mousePressEvent = lambda e: self.open_viewer()
 
             img_lbl.setStyleSheet("background: transparent;")
             bubble_layout.addWidget(img_lbl)
@@ -298,6 +378,52 @@ class ChatBubble(QWidget):
         self.text_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
         self.setLayout(outer)
+
+    # 이미지가 저장소에 기록됨 → 보관하던 원본을 놓고 썸네일을 캐시에 넣음
+    # thumb: 저장된 그림의 썸네일 (PIL, 작업 풀에서 만든 것)
+    #        다시 불러왔을 때와 같은 그림이 되게 빈 자리를 이걸로 바꾼다.
+    def set_image_ref(self, ref, thumb=None):
+        if thumb is not None:
+            self.thumb = pil_to_pixmap(thumb)
+            if self.image_label is not None:
+                self.image_label.setPixmap(self.thumb)
+        if not ref:
+            return
+        self.image_ref = ref
+        self._pending_image = None
+        if thumb is not None and self.thumbs is not None:
+            self.thumbs.put(ref, self.thumb)
+
+    # 이미지 준비 실패 → 들고 있던 원본을 놓고 빈 자리를 치움
+    def drop_pending_image(self):
+        self._pending_image = None
+        self.thumb = None
+        if self.image_label is not None:
+            self.image_label.hide()
+
+    # 원본 이미지 (뷰어를 열 때만)
+    def load_full_image(self):
+        if self._pending_image is not None:
+            return self._pending_image
+        if self.image_ref and self.thumbs is not None:
+            return self.thumbs.store.load_image(self.image_ref)
+        return None
+
+    # 원본 크기 (파일 헤더만 읽음)
+    def image_size(self):
+        if self._pending_image is not None:
+            return self._pending_image.size
+        if self.image_ref and self.thumbs is not None:
+            return self.thumbs.store.image_size(self.image_ref)
+        return None
+
+    # 썸네일로 바로 열고 원본은 뷰어가 백그라운드에서 불러옴
+    def open_viewer(self):
+        if self.thumb is None:
+            return
+        # 닫히면 창이 스스로 지워짐 (WA_DeleteOnClose) → 타일 pixmap 도 함께 해제
+        dlg = ImageViewerDialog(self.thumb, self.image_size(), self.load_full_image, self)
+        dlg.exec()
         
         
 # --------------------------------------------------------
@@ -315,13 +441,9 @@ class MainWindow(QWidget):
             os.makedirs("storage")
 
         # system_prompt.json 자동 생성 + 기본값 채우기
-        prompt_path = "storage/system_prompt.json"
-        if not os.path.exists(prompt_path):
-            save_json(prompt_path, DEFAULT_SYSTEM_PROMPT)
-        else:
-            saved = load_json(prompt_path)
-            if not saved or saved.strip() == "":
-                save_json(prompt_path, DEFAULT_SYSTEM_PROMPT)
+        saved = settings.get("system_prompt")
+        if not saved or saved.strip() == "":
+            settings.set("system_prompt", DEFAULT_SYSTEM_PROMPT)
 
         self.setWindowTitle("AutoCaptureGPT")
         self.resize(360, 600)
@@ -341,10 +463,91 @@ class MainWindow(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 10, 10, 10)
 
-        # 대화 기록 파일
-        self.history_path = "storage/chat_history.json"
-        if not os.path.exists("storage"):
-            os.makedirs("storage")
+        # 캡처 설정 (backend: auto | pil | mss | fake
+        #           mode: Enter 로 찍을 범위 (CAPTURE_MODES, 기본 full)
+        #           + 이미지 전처리: image_pipeline.DEFAULT_IMAGE_SETTINGS)
+        set_backend(self.capture_settings.get("backend", "auto"))
+        self.capture_excluded = None
+        self.region_selector = None
+
+        # 전역 단축키 (storage/hotkey_settings.json, hotkey_daemon.DEFAULT_HOTKEY_SETTINGS)
+        # 다른 앱을 쓰는 중에 찍어서 바로 질문 / 찍어 두고 다음 질문에 붙임
+        self.queued_capture = None
+        self.hotkeys = HotkeyDaemon(lambda: self.capture_settings, self)
+        self.hotkeys.captured.connect(self.on_hotkey_capture)
+        self.hotkeys.start(settings.get("hotkey_settings"))
+        app = QApplication.instance()
+        app.aboutToQuit.connect(self.hotkeys.shutdown)
+        # 종료 시 진행 중인 답변은 끊고 (토큰 낭비 방지) 대기 중인 작업은 버림
+        app.aboutToQuit.connect(self.gpt.scheduler.shutdown)
+        app.aboutToQuit.connect(shutdown_encoder)
+
+        # 화면 변화 감지 (직전 캡처 재사용)
+        self.frame_diff = FrameDiff()
+        self.last_image_future = None
+        self.last_compared = None
+
+        # 단계별 시간 기록 → Ctrl+D 진단 패널
+        # trace 파일은 기본 꺼짐 (storage/trace_settings.json
+        #   {"enabled": true, "max_mb": 5, "keep": 3} 로 켬)
+        tracer.configure(**(settings.get("trace_settings") or {}))
+        self.diagnostics = None
+
+        self.image_store = ImageStore()
+        self.thumbs = ThumbCache(self.image_store)
+        # 대화 기록 저장소 (기존 chat_history.json 은 최초 1회 자동 변환)
+        # 저장할 때마다 검색 색인(storage/search.db)도 갱신
+        self.search_index = SearchIndex()
+        self.history_store = HistoryStore(
+            image_store=self.image_store, index=self.search_index
+        )
+
+        # 대화 기록 페이지 단위 로딩 상태
+        # history_newer: 검색 결과로 이동해서 아래쪽(더 최근)이 비어 있을 때 다음 위치
+        self.HISTORY_PAGE_SIZE = 50
+        self.history_cursor = 0
+        self.history_newer = None
+        self._loading_newer = False
+        self.first_date = None
+        self._loading_older = False
+        self._scroll_restore = None
+        # 검색 이동으로 화면에서 뺀 진행 중 요청의 말풍선 (최신 기록으로 돌아오면 다시 붙임)
+        self.detached_bubbles = []
+
+        # 진행 중 + 대기 중인 GPT 요청 (GPTClient 스케줄러가 순서/동시 실행 관리)
+        self.gpt_workers = []
+
+        # --------------------------------------------------------
+        # 검색창 (Ctrl+F) + 결과 목록
+        # --------------------------------------------------------
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search history (Esc to close)")
+        self.search_box.setStyleSheet(
+            "background:white; color:black; border-radius:6px; padding:6px; font-size:13px;"
+        )
+        self.search_box.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_box.returnPressed.connect(self.open_first_search_result)
+        self.search_box.installEventFilter(self)
+        self.search_box.hide()
+
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(180)
+        self.search_results.setStyleSheet(
+            "QListWidget { background:#222; color:#ddd; border:none; font-size:12px; }"
+            "QListWidget::item:selected { background:#555; }"
+        )
+        self.search_results.itemActivated.connect(self.on_search_result_activated)
+        self.search_results.itemClicked.connect(self.on_search_result_activated)
+        self.search_results.hide()
+
+        # 입력이 멈추면 검색 (글자마다 검색하지 않음)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+
+        layout.addWidget(self.search_box)
+        layout.addWidget(self.search_results)
 
         # --------------------------------------------------------
         # 스크롤 영역
@@ -407,6 +610,10 @@ class MainWindow(QWidget):
         self.chat_container.setLayout(self.chat_layout)
         self.scroll.setWidget(self.chat_container)
 
+        bar = self.scroll.verticalScrollBar()
+        bar.valueChanged.connect(self.on_scroll_value_changed)
+        bar.rangeChanged.connect(self.on_scroll_range_changed)
+
         # ★ 여기! 정확히 여기!
         self.chat_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         
@@ -467,7 +674,7 @@ class MainWindow(QWidget):
             }
         """)
 
-        self.send_btn.clicked.connect(self.send_with_capture)
+        self.send_btn.clicked.connect(self.on_send_clicked)
 
         input_layout.addWidget(self.input)
         input_layout.addWidget(self.send_btn)
@@ -489,75 +696,356 @@ class MainWindow(QWidget):
         if (event.modifiers() & Qt.ControlModifier) and event.key() == Qt.Key_P:
             self.open_system_prompt_editor()
             return
+        if (event.modifiers() & Qt.ControlModifier) and event.key() == Qt.Key_D:
+            self.open_diagnostics()
+            return
+        if (event.modifiers() & Qt.ControlModifier) and event.key() == Qt.Key_F:
+            self.open_search()
+            return
+        if event.key() == Qt.Key_Escape and self.has_running_request():
+            self.stop_generation()
+            return
         super().keyPressEvent(event)
 
+    # storage/capture_settings.json (설정 서비스 캐시, 파일이 바뀌면 자동 반영)
+    @property
+    def capture_settings(self):
+        return settings.get("capture_settings", {})
+
+    # 처음 보일 때 창을 화면 캡처에서 제외 시도
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.capture_excluded is None:
+            self.capture_excluded = exclude_window_from_capture(int(self.winId()))
+
+    # 화면 캡처 (캡처 제외가 되면 창을 숨기지 않음)
+    # bbox: 찍을 영역 (가상 화면 물리 픽셀), None = 모든 모니터
+    def capture_screen(self, bbox=None):
+        if self.capture_excluded:
+            return capture_full_screen(bbox=bbox)
+
+        hwnd = int(self.winId())
+        return capture_full_screen(
+            hide=lambda: self.hide(),
+            show=lambda: self.show(),
+            is_hidden=lambda: not self.isVisible() and window_hidden(hwnd),
+            bbox=bbox
+        )
+
     # 캡처 포함 전송
-    def send_with_capture(self):
+    # mode: full | window (활성 창) | monitor (커서가 있는 모니터) | region (드래그 선택)
+    # 범위를 지정하지 않았고 전역 단축키로 찍어 둔 캡처가 있으면 그걸 붙임
+    def send_with_capture(self, mode=None):
+        if self.region_selector is not None:
+            return
+        queued = self.queued_capture if mode is None else None
+
+        mode = mode or self.capture_settings.get("mode", "full")
+        if mode not in CAPTURE_MODES:
+            log(f"[main] 알 수 없는 캡처 범위: {mode} → full")
+            mode = "full"
+
         text = self.input.toPlainText().strip()
         self.input.clear()
         self.adjust_input_area()
 
-        img = capture_full_screen(
-            hide=lambda: self.hide(),
-            show=lambda: self.show()
+        if queued is not None:
+            self.set_queued_capture(None)
+            img, image_future = queued
+            bubble = self.add_user_bubble(text, image=img)
+            self.start_gpt_request(text, image_future, bubble)
+            return
+
+        if mode == "region":
+            self.select_region(text)
+            return
+
+        # 창을 숨기기 전에 영역을 구해야 z-order 가 그대로
+        bbox = mode_bbox(mode)
+        img = self.capture_screen(bbox)
+        self.send_captured(text, img, whole_screen=bbox is None)
+
+    # 전체 화면을 찍어 멈춘 화면 위에서 영역 선택 → 그 부분만 전송
+    def select_region(self, text):
+        img = self.capture_screen()
+        if img is None:
+            self.input.setPlainText(text)
+            return
+
+        selector = RegionSelector(img)
+        self.region_selector = selector
+
+        def on_selected(box):
+            self.region_selector = None
+            self.activateWindow()
+            self.input.setFocus()
+            self.send_captured(text, img.crop(box), whole_screen=False)
+
+        def on_cancelled():
+            # 취소하면 쓰던 글을 입력창에 되돌림
+            self.region_selector = None
+            self.activateWindow()
+            self.input.setFocus()
+            self.input.setPlainText(text)
+            self.input.moveCursor(QTextCursor.End)
+            self.adjust_input_area()
+
+        selector.selected.connect(on_selected)
+        selector.cancelled.connect(on_cancelled)
+        selector.start()
+
+    # 찍은 이미지 전송 (whole_screen: 모든 모니터를 찍은 경우만 crop 설정 적용)
+    def send_captured(self, text, img, whole_screen=True):
+        # 전처리 (자르기/축소/형식) + 인코딩은 작업 풀에서
+        settings = image_settings(self.capture_settings)
+        crop_box = None
+        if whole_screen and settings["crop"] == "monitor":
+            crop_box = self.monitor_crop_box()
+        image_future = self.prepare_capture(img, settings, crop_box)
+
+        # 인코딩되는 동안 사용자 말풍선 생성
+        bubble = self.add_user_bubble(text, image=img)
+
+        # GPT 호출 (인코딩이 끝나면 워커가 바로 전송)
+        self.start_gpt_request(text, image_future, bubble)
+
+    # 화면 변화 감지 → 재사용 / 바뀐 부분만 / 전체 인코딩
+    # 비교도 작업 풀에서 (GUI 스레드에서 원본 크기 이미지를 줄이지 않음)
+    # 비교는 캡처 순서대로: 앞 캡처의 비교가 끝난 뒤에 시작
+    # last_image_future: 다음 재사용 대상 (전체를 인코딩한 결과, 없으면 None 으로 끝남)
+    def prepare_capture(self, img, settings, crop_box=None):
+        mode = settings["diff_mode"]
+        if mode == "off":
+            return prepare_image_async(img, settings, crop_box)
+
+        frame_diff = self.frame_diff
+        prev_compared = self.last_compared
+        last = self.last_image_future
+        compared = threading.Event()
+        base = Future()
+        self.last_compared = compared
+        self.last_image_future = base
+
+        # 앞 캡처의 인코딩 결과 (없거나 실패했으면 None)
+        def last_result():
+            if last is None:
+                return None
+            try:
+                return last.result()
+            except Exception:
+                return None
+
+        def job():
+            try:
+                if prev_compared is not None:
+                    prev_compared.wait()
+                try:
+                    diff = frame_diff.compare(img)
+                finally:
+                    compared.set()
+
+                previous = last_result() if not diff["changed"] else None
+                if previous is not None:
+                    log("[main] 화면 변화 없음 → 이전 캡처 재사용")
+                    base.set_result(previous)
+                    return reused_result(previous)
+
+                if mode == "region" and diff["bbox"] and \
+                        diff["ratio"] <= settings["region_max_ratio"]:
+                    box = intersect_box(pad_box(diff["bbox"], 32, img.size), crop_box)
+                    prepared = prepare_image(img, settings, box)
+                    # 잘린 이미지는 다음 재사용 대상이 아님
+                    base.set_result(None)
+                    return prepared
+
+                prepared = prepare_image(img, settings, crop_box)
+                base.set_result(prepared)
+                return prepared
+            except Exception as e:
+                if not base.done():
+                    base.set_exception(e)
+                raise
+
+        return encode_executor().submit(job)
+
+    # 전역 단축키로 찍은 캡처 (작업 스레드에서 찍고 인코딩도 이미 시작됨)
+    # 창을 앞으로 가져오지 않고 말풍선만 추가
+    def on_hotkey_capture(self, action, img, image_future):
+        if action == "queue":
+            self.set_queued_capture((img, image_future))
+            return
+
+        text = self.hotkeys.settings["ask_text"]
+        bubble = self.add_user_bubble(text, image=img)
+        self.start_gpt_request(text, image_future, bubble)
+
+    def set_queued_capture(self, queued):
+        self.queued_capture = queued
+        self.input.setPlaceholderText(
+            "📎 Screenshot queued — Enter to ask about it" if queued else ""
         )
-        img_b64 = image_to_base64(img)
 
-        # 사용자 말풍선
-        self.add_user_bubble(text, img_b64)
-        self.save_chat_history("user", text, img_b64)
+    # 앱 창이 있는 모니터의 캡처 이미지 내 좌표 (left, top, right, bottom)
+    # 모니터마다 배율이 다르면 근사값
+    def monitor_crop_box(self):
+        screen = self.screen()
+        if screen is None:
+            return None
+        virtual = screen.virtualGeometry()
+        geo = screen.geometry()
+        dpr = screen.devicePixelRatio()
+        left = int((geo.x() - virtual.x()) * dpr)
+        top = int((geo.y() - virtual.y()) * dpr)
+        return (
+            left, top,
+            left + int(geo.width() * dpr),
+            top + int(geo.height() * dpr)
+        )
+
+    # --------------------------------------------------------
+    # GPT 요청 시작 (답변 중에 보내도 대기열에 들어가 동시에/순서대로 처리)
+    # --------------------------------------------------------
+    def start_gpt_request(self, text, image_future=None, user_bubble=None):
+        t_start = time.perf_counter()
+
+        # 사용자 메시지 기록은 요청이 실제로 시작될 때 (기록 순서 = 대화 순서)
+        # 이미지가 있으면 인코딩이 끝난 뒤, 대기 중에 취소되면 기록하지 않음
+        def on_started():
+            if image_future is None:
+                offset = self.save_chat_history("user", text, None)
+                if user_bubble is not None:
+                    user_bubble.offset = offset
+
+        def on_image_ready(prepared):
+            ocr = prepared.get("ocr")
+            offset = self.save_chat_history(
+                "user", text, prepared["ref"], prepared["meta"],
+                ocr_text=ocr["text"] if ocr else None
+            )
+            if user_bubble is not None:
+                user_bubble.offset = offset
+                user_bubble.set_image_ref(prepared["ref"], prepared.get("thumb"))
+
+        # 이미지 준비 실패 → 질문만이라도 기록 (실패 표시와 함께)
+        def on_image_failed(err):
+            offset = self.save_chat_history("user", text, None, image_error=err)
+            if user_bubble is not None:
+                user_bubble.offset = offset
+                user_bubble.drop_pending_image()
+                user_bubble.text_label.setText(
+                    (text + "\n\n" if text else "") + IMAGE_FAILED_MARKER
+                )
 
         # GPT 말풍선 생성
         gpt_bubble = ChatBubble("", False, None, now_timestamp())
         self.chat_layout.addWidget(gpt_bubble)
         self.scroll_bottom()
 
-        # 스트리밍 내용 저장 변수
-        full_text = ""
-
-        # 스트리밍 콜백
-        def on_delta(ch):
-            nonlocal full_text
-            if not ch:
-                return
-            full_text += ch
-            gpt_bubble.text_label.setText(full_text)
-            self.scroll_bottom()
-
-        # GPT 호출
-        self.gpt.send_message(text, img_b64, on_delta=on_delta)
-
-        # 저장
-        self.save_chat_history("assistant", full_text, None)
+        # 토큰을 프레임 단위로 모아서 그림
+        renderer = StreamRenderer(
+            gpt_bubble.text_label, self.scroll.verticalScrollBar(), parent=gpt_bubble
+        )
 
+        def on_completed(full, truncated):
+            renderer.finish()
+            if truncated:
+                gpt_bubble.text_label.setText(full + "\n\n" + STOPPED_MARKER)
+            gpt_bubble.offset = self.save_chat_history(
+                "assistant", full, None, truncated=truncated
+            )
+            tracer.record("reply_total", t_start, time.perf_counter(),
+                          image=image_future is not None, truncated=truncated)
+
+        # ■ / Esc → 워커를 기다리지 않고 화면부터 마무리 (늦게 온 조각은 무시)
+        def on_stopping():
+            worker.delta.disconnect(renderer.push)
+            renderer.finish()
+            gpt_bubble.text_label.setText(renderer.text + "\n\n" + STOPPED_MARKER)
+            self.set_streaming_ui(self.has_running_request())
+
+        def on_failed(err):
+            renderer.finish()
+            gpt_bubble.text_label.setText(renderer.text + f"\n\n[오류] {err}")
+
+        worker = GPTWorker(
+            self.gpt, text,
+            image_future=image_future, image_store=self.image_store, parent=self
+        )
+        # 검색으로 이동해도 지우지 않고 떼어 두는 말풍선
+        worker.bubbles = [b for b in (user_bubble, gpt_bubble) if b is not None]
+        worker.started.connect(on_started)
+        worker.image_ready.connect(on_image_ready)
+        worker.image_failed.connect(on_image_failed)
+        worker.delta.connect(renderer.push)
+        worker.completed.connect(on_completed)
+        worker.stopping.connect(on_stopping)
+        worker.failed.connect(on_failed)
+        worker.finished.connect(lambda: self.on_gpt_worker_finished(worker))
+        self.gpt_workers.append(worker)
+        self.set_streaming_ui(True)
+        worker.start()
+
+    def on_gpt_worker_finished(self, worker):
+        if worker in self.gpt_workers:
+            self.gpt_workers.remove(worker)
+            worker.deleteLater()
+        # 떼어 둔 말풍선은 이제 기록 파일에 있으므로 정리
+        for bubble in worker.bubbles:
+            if bubble in self.detached_bubbles:
+                self.detached_bubbles.remove(bubble)
+                bubble.deleteLater()
+        self.set_streaming_ui(self.has_running_request())
+
+    # 중단 요청을 받지 않은 요청이 남아 있는지
+    def has_running_request(self):
+        return any(not w.stopped for w in self.gpt_workers)
+
+    # --------------------------------------------------------
+    # 답변 중단 (■ 버튼 / Esc)
+    # --------------------------------------------------------
+    def stop_generation(self):
+        for worker in list(self.gpt_workers):
+            worker.cancel()
+
+    def on_send_clicked(self):
+        if self.has_running_request():
+            self.stop_generation()
+        else:
+            self.send_with_capture()
 
+    # 스트리밍 중에는 전송 버튼이 중단 버튼으로
+    def set_streaming_ui(self, streaming):
+        self.send_btn.setText("■" if streaming else "➤")
+        self.send_btn.setToolTip("Stop (Esc)" if streaming else "")
 
     def open_system_prompt_editor(self):
         dlg = SystemPromptDialog(self)
         dlg.exec()
 
+    # 진단 패널은 모달 없이 (열어둔 채로 계속 사용)
+    def open_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(self)
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
     #붙여넣기 이미지 처리 함수
 
     def handle_paste_image(self, qimage):
-        from utils import image_to_base64
+        # QImage → PIL (줄 끝 패딩은 stride 로 처리, PIL 쪽은 복사본)
+        pil_img = ImageBuffer.from_qimage(qimage).to_pil()
 
-        # QImage → bytes 변환
-        qimage = qimage.convertToFormat(QImage.Format_RGBA8888)
-        width = qimage.width()
-        height = qimage.height()
-        bytes_data = qimage.bits().tobytes()
-
-        # bytes → PIL.Image
-        pil_img = Image.frombytes("RGBA", (width, height), bytes_data)
-
-        img_b64 = image_to_base64(pil_img)
+        # PNG 바이트를 그대로 저장 (base64 를 거치지 않음)
+        data, _, ext, _ = encode_image(pil_img, image_settings({"format": "png"}))
 
         # 붙여넣기 시 입력창에 안내 표시
         # self.input.setPlainText("(이미지 붙여넣기)")
 
         # 버블로 추가
-        self.add_user_bubble("", img_b64)
-        self.save_chat_history("user", "", img_b64)
+        ref = self.image_store.put_bytes(data, ext)
+        bubble = self.add_user_bubble("", image=pil_img)
+        bubble.set_image_ref(ref, make_thumbnail(pil_img))
+        self.save_chat_history("user", "", ref)
 
     # 입력창 자동 높이
     def adjust_input_area(self):
@@ -577,54 +1065,279 @@ class MainWindow(QWidget):
             self.chat_layout.addWidget(sep)
             self.last_date = date_str
 
-    # 대화 기록 저장
-    def save_chat_history(self, role, text, img_b64):
-        history = []
-        if os.path.exists(self.history_path):
-            try:
-                with open(self.history_path, "r", encoding="utf-8") as f:
-                    history = json.load(f)
-            except:
-                history = []
-
+    # 대화 기록 저장 (파일 끝에 한 줄 추가) → 파일 내 위치
+    def save_chat_history(self, role, text, img_ref, img_meta=None, truncated=False,
+                          ocr_text=None, image_error=None):
         entry = {
             "role": role,
             "text": text,
-            "img": img_b64,
+            "img_ref": img_ref,
             "timestamp": now_timestamp(),
             "date": today_str()
         }
-        history.append(entry)
+        if img_meta:
+            entry["img_meta"] = img_meta
+        if truncated:
+            entry["truncated"] = True
+        if ocr_text:
+            entry["ocr"] = ocr_text
+        if image_error:
+            entry["image_error"] = image_error
+        with span("save_chat_history", role=role):
+            return self.history_store.append(entry)
+
+    # 대화 불러오기 (최근 HISTORY_PAGE_SIZE 개만, 나머지는 위로 스크롤할 때)
+    def load_chat_history(self):
+        try:
+            entries, self.history_cursor = self.history_store.read_page(
+                None, self.HISTORY_PAGE_SIZE
+            )
+        except:
+            return
 
-        with open(self.history_path, "w", encoding="utf-8") as f:
-            json.dump(history, f, indent=2, ensure_ascii=False)
+        for entry in entries:
+            self.add_date_separator_if_needed(entry["date"])
+            self.chat_layout.addWidget(self.make_history_bubble(entry))
 
-    # 대화 불러오기
-    
-    def load_chat_history(self):
-        if not os.path.exists(self.history_path):
+        if entries:
+            self.first_date = entries[0]["date"]
+        self.reattach_live_bubbles()
+
+        QTimer.singleShot(0, self.scroll_bottom)
+
+    # 이전 페이지를 맨 위에 끼워 넣기
+    def load_older_history(self):
+        if self.history_cursor <= 0 or self._loading_older:
             return
+        self._loading_older = True
 
         try:
-            with open(self.history_path, "r", encoding="utf-8") as f:
-                history = json.load(f)
+            entries, self.history_cursor = self.history_store.read_page(
+                self.history_cursor, self.HISTORY_PAGE_SIZE
+            )
         except:
+            entries = []
+            self.history_cursor = 0
+
+        if not entries:
+            self._loading_older = False
             return
 
-        history.sort(key=lambda x: (x["date"], x["timestamp"]))
+        bar = self.scroll.verticalScrollBar()
+        self._scroll_restore = (bar.maximum(), bar.value())
+
+        widgets = []
+        prev_date = None
+        for entry in entries:
+            if entry["date"] != prev_date:
+                widgets.append(DateSeparator(format_date(entry["date"])))
+                prev_date = entry["date"]
+            widgets.append(self.make_history_bubble(entry))
+
+        # 기존 맨 위 날짜와 같으면 중복 구분선 제거
+        if prev_date == self.first_date:
+            top = self.chat_layout.itemAt(0)
+            if top and isinstance(top.widget(), DateSeparator):
+                w = top.widget()
+                self.chat_layout.removeWidget(w)
+                w.deleteLater()
+
+        for i, w in enumerate(widgets):
+            self.chat_layout.insertWidget(i, w)
+
+        self.first_date = entries[0]["date"]
+        self._loading_older = False
+
+    def make_history_bubble(self, entry):
+        ts = entry["timestamp"]
+        with span("bubble_render", source="history"):
+            if entry["role"] == "user":
+                text = entry["text"]
+                if entry.get("image_error"):
+                    text += "\n\n" + IMAGE_FAILED_MARKER
+                bubble = ChatBubble(
+                    text, True, None, ts,
+                    image_ref=entry.get("img_ref"),
+                    thumbs=self.thumbs
+                )
+            else:
+                text = entry["text"]
+                if entry.get("truncated"):
+                    text += "\n\n" + STOPPED_MARKER
+                bubble = ChatBubble(text, False, None, ts)
+        # 기록 파일 내 위치 (검색 결과로 이동할 때 사용)
+        bubble.offset = entry.get("_offset")
+        return bubble
+
+    # 검색으로 이동한 뒤 아래쪽(더 최근) 페이지를 끝에 이어 붙이기
+    def load_newer_history(self):
+        if self.history_newer is None or self._loading_newer:
+            return
+        self._loading_newer = True
 
-        for entry in history:
-            date = entry["date"]
-            ts = entry["timestamp"]
+        try:
+            entries, cursor = self.history_store.read_after(
+                self.history_newer, self.HISTORY_PAGE_SIZE
+            )
+        except:
+            entries, cursor = [], self.history_store.size()
+
+        for entry in entries:
+            self.add_date_separator_if_needed(entry["date"])
+            self.chat_layout.addWidget(self.make_history_bubble(entry))
+
+        self.history_newer = cursor if cursor < self.history_store.size() else None
+        if self.history_newer is None:
+            self.reattach_live_bubbles()
+        self._loading_newer = False
+
+    # 맨 위에 닿으면 이전 페이지, 맨 아래에 닿으면 (검색 이동 후) 다음 페이지
+    def on_scroll_value_changed(self, value):
+        bar = self.scroll.verticalScrollBar()
+        if value == bar.minimum():
+            QTimer.singleShot(0, self.load_older_history)
+        elif value == bar.maximum() and self.history_newer is not None:
+            QTimer.singleShot(0, self.load_newer_history)
+
+    # --------------------------------------------------------
+    # 기록 검색 (Ctrl+F) → 결과를 고르면 그 메시지로 이동
+    # --------------------------------------------------------
+    def open_search(self):
+        self.search_box.show()
+        self.search_box.setFocus()
+        self.search_box.selectAll()
+        if self.search_box.text().strip():
+            self.run_search()
+
+    def close_search(self):
+        self.search_timer.stop()
+        self.search_box.hide()
+        self.search_results.hide()
+        self.input.setFocus()
+
+    def run_search(self):
+        query = self.search_box.text().strip()
+        self.search_results.clear()
+        if not query:
+            self.search_results.hide()
+            return
 
-            self.add_date_separator_if_needed(date)
+        with span("search", terms=len(query.split())):
+            hits = self.search_index.search(query)
+
+        for hit in hits:
+            who = "Me" if hit["role"] == "user" else "GPT"
+            item = QListWidgetItem(f"{hit['timestamp']}  {who}: {hit['snippet']}")
+            item.setData(Qt.UserRole, hit["offset"])
+            self.search_results.addItem(item)
+        if not hits:
+            self.search_results.addItem(QListWidgetItem("(no results)"))
+        self.search_results.show()
+
+    def open_first_search_result(self):
+        item = self.search_results.item(0)
+        if item is not None:
+            self.on_search_result_activated(item)
+
+    def on_search_result_activated(self, item):
+        offset = item.data(Qt.UserRole)
+        if offset is not None:
+            self.jump_to_offset(offset, self.search_box.text().strip())
+
+    def jump_to_offset(self, offset, query=""):
+        bubble = self.bubble_at(offset)
+        if bubble is None:
+            # 그 위치의 페이지만 바로 읽음 (답변 중인 말풍선은 떼어 두었다가 다시 붙임)
+            self.load_history_around(offset)
+            bubble = self.bubble_at(offset)
+
+        if bubble is not None:
+            QTimer.singleShot(0, lambda: self.reveal_bubble(bubble, query))
+
+    def bubble_at(self, offset):
+        for i in range(self.chat_layout.count()):
+            w = self.chat_layout.itemAt(i).widget()
+            if w is not None and getattr(w, "offset", None) == offset:
+                return w
+        return None
+
+    # offset 앞뒤로 반 페이지씩만 새로 그림
+    def load_history_around(self, offset):
+        half = self.HISTORY_PAGE_SIZE // 2
+        try:
+            older, cursor = self.history_store.read_page(offset, half)
+            newer, newer_cursor = self.history_store.read_after(offset, half)
+        except:
+            return
 
-            if entry["role"] == "user":
-                bubble = ChatBubble(entry["text"], True, entry.get("img"), ts)
+        self.clear_chat()
+        self.history_cursor = cursor
+        self.history_newer = newer_cursor if newer_cursor < self.history_store.size() else None
+
+        entries = older + newer
+        for entry in entries:
+            self.add_date_separator_if_needed(entry["date"])
+            self.chat_layout.addWidget(self.make_history_bubble(entry))
+        if entries:
+            self.first_date = entries[0]["date"]
+        if self.history_newer is None:
+            self.reattach_live_bubbles()
+
+    # 찾은 말풍선을 화면에 보이고 검색어를 선택 표시
+    def reveal_bubble(self, bubble, query=""):
+        self.chat_layout.activate()
+        self.scroll.ensureWidgetVisible(bubble, 0, self.scroll.viewport().height() // 3)
+
+        text = bubble.text_label.text().lower()
+        for term in query.lower().split():
+            pos = text.find(term)
+            if pos >= 0:
+                bubble.text_label.setSelection(pos, len(term))
+                break
+
+    # 화면 비우기 (진행 중 요청의 말풍선은 지우지 않고 떼어 둠)
+    def clear_chat(self):
+        live = {b for w in self.gpt_workers for b in getattr(w, "bubbles", [])}
+        while self.chat_layout.count():
+            w = self.chat_layout.takeAt(0).widget()
+            if w is None:
+                continue
+            if w in live:
+                w.hide()
+                w.setParent(None)
+                self.detached_bubbles.append(w)
             else:
-                bubble = ChatBubble(entry["text"], False, None, ts)
-
-            self.chat_layout.addWidget(bubble)
+                w.deleteLater()
+        self.last_date = None
+        self.first_date = None
+
+    # 최신 기록 끝에 도착 → 아직 기록되지 않은 진행 중 말풍선을 다시 붙임
+    # (이미 기록된 것은 방금 불러온 기록에 들어 있으므로 요청이 끝날 때 정리)
+    def reattach_live_bubbles(self):
+        keep = []
+        for bubble in self.detached_bubbles:
+            if getattr(bubble, "offset", None) is None:
+                self.chat_layout.addWidget(bubble)
+                bubble.show()
+            else:
+                keep.append(bubble)
+        self.detached_bubbles = keep
+
+    # 검색으로 옛 기록을 보던 중이면 최신 기록으로 돌아옴
+    def show_latest_history(self):
+        self.clear_chat()
+        self.history_newer = None
+        self.load_chat_history()
+
+    # 레이아웃 갱신 후 스크롤 위치 보정
+    def on_scroll_range_changed(self, minimum, maximum):
+        if self._scroll_restore is not None:
+            old_max, old_value = self._scroll_restore
+            self._scroll_restore = None
+            self.scroll.verticalScrollBar().setValue(maximum - old_max + old_value)
+        elif maximum == 0 and self.history_cursor > 0:
+            # 화면을 다 채우지 못하면 스크롤이 생길 때까지 더 불러옴
+            QTimer.singleShot(0, self.load_older_history)
 
     # 엔터키 처리
     def eventFilter(self, obj, event):
@@ -641,6 +1354,50 @@ class MainWindow(QWidget):
                 self.open_system_prompt_editor()
                 return True
 
+        # ----------------------------
+        # Ctrl + D → 진단 패널 (단계별 소요 시간)
+        # ----------------------------
+        if obj == self.input and event.type() == QEvent.KeyPress:
+            if (event.modifiers() & Qt.ControlModifier) and event.key() == Qt.Key_D:
+                self.open_diagnostics()
+                return True
+
+        # ----------------------------
+        # Ctrl + F → 기록 검색 / 검색창에서 Esc → 닫기, ↓ → 결과 목록
+        # ----------------------------
+        if obj == self.input and event.type() == QEvent.KeyPress:
+            if (event.modifiers() & Qt.ControlModifier) and event.key() == Qt.Key_F:
+                self.open_search()
+                return True
+
+        if obj == self.search_box and event.type() == QEvent.KeyPress:
+            if event.key() == Qt.Key_Escape:
+                self.close_search()
+                return True
+            if event.key() == Qt.Key_Down and self.search_results.count():
+                self.search_results.setFocus()
+                self.search_results.setCurrentRow(0)
+                return True
+
+        # ----------------------------
+        # Esc → 답변 중단
+        # ----------------------------
+        if obj == self.input and event.type() == QEvent.KeyPress:
+            if event.key() == Qt.Key_Escape and self.has_running_request():
+                self.stop_generation()
+                return True
+
+        # ----------------------------
+        # Ctrl + Shift + W / M / R → 활성 창 / 커서 모니터 / 영역 선택 캡처 전송
+        # ----------------------------
+        if obj == self.input and event.type() == QEvent.KeyPress:
+            mods = event.modifiers()
+            if (mods & Qt.ControlModifier) and (mods & Qt.ShiftModifier):
+                mode = CAPTURE_HOTKEYS.get(event.key())
+                if mode:
+                    self.send_with_capture(mode)
+                    return True
+
         # ----------------------------
         # Enter 처리
         # ----------------------------
@@ -659,21 +1416,29 @@ class MainWindow(QWidget):
 
         return super().eventFilter(obj, event)
 
-    # 스크롤 맨 아래로
+    # 스크롤 맨 아래로 (레이아웃 갱신 뒤에 실행되도록 이벤트 루프에 맡김)
     def scroll_bottom(self):
-        QApplication.processEvents()
+        QTimer.singleShot(0, self._scroll_to_max)
+
+    def _scroll_to_max(self):
         self.scroll.verticalScrollBar().setValue(
             self.scroll.verticalScrollBar().maximum()
         )
 
     # 말풍선
-    def add_user_bubble(self, text, img_b64=None):
+    def add_user_bubble(self, text, img_b64=None, image=None):
+        if self.history_newer is not None:
+            self.show_latest_history()
+
         date = today_str()               # 메시지의 실제 날짜(저장용)
         self.add_date_separator_if_needed(date)
-        bubble = ChatBubble(text, True, img_b64, now_timestamp())
-        self.chat_layout.addWidget(bubble)
+        with span("bubble_render", source="user"):
+            bubble = ChatBubble(text, True, img_b64, now_timestamp(),
+                                thumbs=self.thumbs, image=image)
+            self.chat_layout.addWidget(bubble)
 
         QTimer.singleShot(0, self.scroll_bottom)
+        return bubble
 
 
     def add_gpt_bubble(self, text, date):
@@ -709,29 +1474,10 @@ class MainWindow(QWidget):
         self.adjust_input_area()
 
         # 사용자 말풍선
-        self.add_user_bubble(text)
-        self.save_chat_history("user", text, None)
-
-        # GPT 버블
-        gpt_bubble = ChatBubble("", False, None, now_timestamp())
-        self.chat_layout.addWidget(gpt_bubble)
-        self.scroll_bottom()
-
-        # ★ full_text 선언
-        full_text = ""
-
-        # 스트리밍 콜백
-        def on_delta(ch):
-            nonlocal full_text
-            full_text += ch
-            gpt_bubble.text_label.setText(full_text)
-            self.scroll_bottom()
-
-        # GPT 호출
-        self.gpt.send_message(text, on_delta=on_delta)
+        bubble = self.add_user_bubble(text)
 
-        # 저장
-        self.save_chat_history("assistant", full_text, None)
+        # GPT 호출 (워커 스레드)
+        self.start_gpt_request(text, user_bubble=bubble)
 
     def force_refresh_layout(self):
         self.chat_container.updateGeometry()
@@ -754,8 +1500,9 @@ icon_path = os.path.join(BASE_DIR, "assets", "icons", "app.ico")
 
 app.setWindowIcon(QIcon(icon_path))
 
-key = load_json("storage/api_key.json")
-if not key or "api_key" not in key:
+key = settings.get("api_key")
+backend = settings.get("backend") or {}
+if backend.get("type", "openai") == "openai" and (not key or "api_key" not in key):
     dlg = ApiKeyDialog()
     dlg.exec()
 
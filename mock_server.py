@@ -0,0 +1,174 @@
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from backends import mock_reply
+
+
+# ----------------------------------------------------------
+# OpenAI 호환 가짜 스트리밍 서버 (로컬 테스트 / 벤치마크용)
+#   POST /v1/chat/completions  (stream=True, SSE)
+#   GET  /v1/models            (prewarm 용)
+# transport_settings.json 의 base_url 을 http://127.0.0.1:<port>/v1 로
+# 바꾸면 앱이 실제 HTTP 경로 그대로 이 서버와 통신한다.
+# ----------------------------------------------------------
+class MockServer:
+    """
+    ttft:       요청 본문을 다 받은 뒤 첫 조각까지 지연 (초)
+    token_rate: 초당 조각 수 (0 = 지연 없이)
+    tokens:     답변 조각 수
+    echo:       받은 메시지 크기를 답변 앞에 붙임
+    """
+
+    def __init__(self, host="127.0.0.1", port=0,
+                 ttft=0.3, token_rate=50, tokens=200, echo=True):
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.echo = echo
+
+        # 마지막 요청 기록 (같은 프로세스의 벤치마크가 업로드 시간 계산에 사용)
+        self.last_request = {}
+        self.request_count = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="mock-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _make_handler(server):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, code, data):
+            body = json.dumps(data).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [
+                    {"id": "gpt-5.1", "object": "model", "created": 0, "owned_by": "mock"}
+                ]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            received = time.perf_counter()
+
+            try:
+                body = json.loads(raw)
+            except Exception:
+                self._send_json(400, {"error": {"message": "bad json"}})
+                return
+
+            server.request_count += 1
+            server.last_request = {"bytes": len(raw), "received": received}
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            try:
+                self._stream(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # 클라이언트가 중단함
+                pass
+
+        def _write_chunk(self, data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def _event(self, payload):
+            self._write_chunk(b"data: " + json.dumps(payload).encode() + b"\n\n")
+
+        def _stream(self, body):
+            model = body.get("model", "mock")
+            pieces = mock_reply(body.get("messages", []), server.tokens, server.echo)
+            interval = 1.0 / server.token_rate if server.token_rate else 0
+
+            time.sleep(server.ttft)
+            for piece in pieces:
+                self._event({
+                    "id": "mock", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece},
+                                 "finish_reason": None}],
+                })
+                if interval:
+                    time.sleep(interval)
+
+            self._event({
+                "id": "mock", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+# ----------------------------------------------------------
+# 단독 실행: python mock_server.py --port 8765 --ttft 0.5
+# ----------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI 호환 가짜 스트리밍 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-rate", type=float, default=50)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--no-echo", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = MockServer(
+        args.host, args.port, args.ttft, args.token_rate, args.tokens,
+        echo=not args.no_echo
+    )
+    print(f"mock server: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
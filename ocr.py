@@ -0,0 +1,217 @@
+import sys
+import time
+import threading
+
+from utils import log
+from tracing import span
+
+
+# ----------------------------------------------------------
+# 로컬 OCR (선택 설치)
+#   winsdk      : pip install winsdk       (Windows 10+ 내장 OCR, 빠름)
+#   tesseract   : pip install pytesseract  + tesseract 실행 파일 / 언어 데이터
+# recognize(img) → [{"text": 한 줄, "box": (left, top, right, bottom)}, ...]
+# ----------------------------------------------------------
+class OcrEngine:
+    name = ""
+
+    def available(self):
+        return True
+
+    def recognize(self, img):
+        raise NotImplementedError
+
+
+# Windows.Media.Ocr (사용자 언어 팩 기준)
+class WinOcrEngine(OcrEngine):
+    name = "winsdk"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def available(self):
+        if sys.platform != "win32":
+            return False
+        try:
+            import winsdk.windows.media.ocr  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    # WinRT 객체는 스레드마다 따로
+    def _engine(self):
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            from winsdk.windows.media.ocr import OcrEngine as WinOcr
+            engine = WinOcr.try_create_from_user_profile_languages()
+            if engine is None:
+                raise RuntimeError("OCR 언어 팩이 없음")
+            self._local.engine = engine
+        return engine
+
+    def recognize(self, img):
+        import asyncio
+        from winsdk.windows.media.ocr import OcrEngine as WinOcr
+        from winsdk.windows.graphics.imaging import SoftwareBitmap, BitmapPixelFormat
+        from winsdk.windows.storage.streams import DataWriter
+
+        # 최대 크기를 넘으면 줄여서 읽고 좌표는 원본 기준으로 되돌림
+        limit = WinOcr.max_image_dimension
+        scale = min(1.0, limit / max(img.size))
+        if scale < 1.0:
+            img = img.resize((int(img.width * scale), int(img.height * scale)))
+
+        rgba = img.convert("RGBA")
+        writer = DataWriter()
+        writer.write_bytes(rgba.tobytes())
+        bitmap = SoftwareBitmap.create_copy_from_buffer(
+            writer.detach_buffer(), BitmapPixelFormat.RGBA8, rgba.width, rgba.height
+        )
+
+        # asyncio.run 은 코루틴만 받으므로 WinRT IAsyncOperation 을 await 로 감쌈
+        engine = self._engine()
+
+        async def _run():
+            return await engine.recognize_async(bitmap)
+
+        result = asyncio.run(_run())
+
+        lines = []
+        for line in result.lines:
+            rects = [w.bounding_rect for w in line.words]
+            if not rects:
+                continue
+            box = (
+                min(r.x for r in rects), min(r.y for r in rects),
+                max(r.x + r.width for r in rects), max(r.y + r.height for r in rects),
+            )
+            lines.append({"text": line.text, "box": tuple(int(v / scale) for v in box)})
+        return lines
+
+
+# Tesseract (pytesseract)
+class TesseractEngine(OcrEngine):
+    name = "tesseract"
+
+    def __init__(self, lang="kor+eng"):
+        self.lang = lang
+
+    def available(self):
+        try:
+            import pytesseract
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def recognize(self, img):
+        import pytesseract
+
+        data = pytesseract.image_to_data(
+            img, lang=self.lang, output_type=pytesseract.Output.DICT
+        )
+
+        # 단어 → (블록, 문단, 줄) 단위로 묶기
+        grouped = {}
+        for i, word in enumerate(data["text"]):
+            word = word.strip()
+            if not word or float(data["conf"][i]) < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            left, top = data["left"][i], data["top"][i]
+            right, bottom = left + data["width"][i], top + data["height"][i]
+            line = grouped.get(key)
+            if line is None:
+                grouped[key] = {"words": [word], "box": [left, top, right, bottom]}
+            else:
+                line["words"].append(word)
+                b = line["box"]
+                line["box"] = [min(b[0], left), min(b[1], top), max(b[2], right), max(b[3], bottom)]
+
+        return [
+            {"text": " ".join(line["words"]), "box": tuple(line["box"])}
+            for line in grouped.values()
+        ]
+
+
+ENGINES = {
+    "winsdk": WinOcrEngine,
+    "tesseract": TesseractEngine,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+# ----------------------------------------------------------
+# 엔진 선택 (auto: winsdk → tesseract), 없으면 None
+# ----------------------------------------------------------
+def get_engine(name="auto", lang="kor+eng"):
+    key = (name, lang)
+    with _engines_lock:
+        if key in _engines:
+            return _engines[key]
+
+        order = ["winsdk", "tesseract"] if name == "auto" else [name]
+        engine = None
+        for candidate in order:
+            cls = ENGINES.get(candidate)
+            if cls is None:
+                log(f"[ocr] 알 수 없는 엔진: {candidate}")
+                continue
+            obj = cls(lang) if cls is TesseractEngine else cls()
+            if obj.available():
+                engine = obj
+                break
+
+        if engine is None:
+            log(f"[ocr] 사용할 수 있는 OCR 엔진 없음 ({name}) → OCR 생략")
+        else:
+            log(f"[ocr] engine: {engine.name}")
+        _engines[key] = engine
+        return engine
+
+
+# ----------------------------------------------------------
+# 이미지 → {"text", "lines", "engine", "ms"} (엔진이 없거나 실패하면 None)
+# 줄은 위→아래, 왼→오른 순서. 세로 간격이 크게 벌어지면 빈 줄로 구분.
+# ----------------------------------------------------------
+def run_ocr(img, settings):
+    engine = get_engine(settings["ocr_engine"], settings["ocr_lang"])
+    if engine is None:
+        return None
+
+    start = time.perf_counter()
+    try:
+        with span("ocr", engine=engine.name):
+            lines = engine.recognize(img)
+    except Exception as e:
+        log(f"[ocr] {engine.name} ERROR: {e}")
+        return None
+
+    lines.sort(key=lambda l: (l["box"][1], l["box"][0]))
+    return {
+        "text": layout_text(lines),
+        "lines": lines,
+        "engine": engine.name,
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def layout_text(lines):
+    out = []
+    prev_bottom = None
+    for line in lines:
+        top, bottom = line["box"][1], line["box"][3]
+        height = max(1, bottom - top)
+        if prev_bottom is not None and top - prev_bottom > height:
+            out.append("")
+        out.append(line["text"])
+        prev_bottom = bottom
+    return "\n".join(out)
+
+
+# 모델에 보낼 사용자 메시지 (질문 + 화면 글자)
+def ocr_prompt(text, ocr_text):
+    note = "[Screen text (OCR)]\n" + ocr_text
+    return (text + "\n\n" + note) if text else note
@@ -0,0 +1,138 @@
+from PySide6.QtCore import Qt, Signal, QRect, QPoint
+from PySide6.QtGui import QPainter, QColor, QPen, QGuiApplication
+from PySide6.QtWidgets import QWidget
+
+from utils import ImageBuffer
+
+
+# 이보다 작게 끌면 (사실상 클릭) 선택 취소
+MIN_SELECTION = 6
+
+
+# ----------------------------------------------------------
+# 영역 선택 오버레이
+# ----------------------------------------------------------
+class RegionSelector(QWidget):
+    """
+    방금 찍은 전체 화면을 가상 화면 위에 덮어 보여주고 드래그로 영역을 고른다.
+    화면을 멈춘 상태에서 고르므로 다시 찍지 않고 이 이미지를 자르면 된다.
+    selected: 이미지 좌표 (left, top, right, bottom)
+    cancelled: Esc / 오른쪽 클릭 / 너무 작은 선택
+    모니터마다 배율이 다르면 좌표는 근사값
+    """
+
+    selected = Signal(tuple)
+    cancelled = Signal()
+
+    def __init__(self, img):
+        super().__init__(None, Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setCursor(Qt.CrossCursor)
+        self.setMouseTracking(True)
+
+        self.image_size = img.size
+        self.pixmap = ImageBuffer.from_pil(img).to_qpixmap()
+        self.origin = None
+        self.current = None
+        self.done = False
+
+        self.setGeometry(QGuiApplication.primaryScreen().virtualGeometry())
+
+    def start(self):
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.setFocus()
+
+    def selection(self):
+        if self.origin is None or self.current is None:
+            return QRect()
+        return QRect(self.origin, self.current).normalized()
+
+    # 위젯 좌표 → 이미지 좌표
+    def to_image_box(self, rect):
+        sx = self.image_size[0] / max(1, self.width())
+        sy = self.image_size[1] / max(1, self.height())
+        left = max(0, int(rect.left() * sx))
+        top = max(0, int(rect.top() * sy))
+        right = min(self.image_size[0], int((rect.right() + 1) * sx))
+        bottom = min(self.image_size[1], int((rect.bottom() + 1) * sy))
+        return (left, top, right, bottom)
+
+    def finish(self, box=None):
+        if self.done:
+            return
+        self.done = True
+        self.close()
+        if box:
+            self.selected.emit(box)
+        else:
+            self.cancelled.emit()
+
+    # ------------------------------------------------------
+    # 그리기: 화면 사진 + 어둡게, 선택 영역만 밝게
+    # ------------------------------------------------------
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.drawPixmap(self.rect(), self.pixmap)
+
+        sel = self.selection()
+        shade = QColor(0, 0, 0, 110)
+        if sel.isEmpty():
+            painter.fillRect(self.rect(), shade)
+            return
+
+        # 선택 영역 바깥 네 조각만 어둡게
+        full = self.rect()
+        painter.fillRect(QRect(full.left(), full.top(), full.width(), sel.top() - full.top()), shade)
+        painter.fillRect(QRect(full.left(), sel.bottom() + 1, full.width(), full.bottom() - sel.bottom()), shade)
+        painter.fillRect(QRect(full.left(), sel.top(), sel.left() - full.left(), sel.height()), shade)
+        painter.fillRect(QRect(sel.right() + 1, sel.top(), full.right() - sel.right(), sel.height()), shade)
+
+        painter.setPen(QPen(QColor(80, 160, 255), 1))
+        painter.drawRect(sel.adjusted(0, 0, -1, -1))
+
+        left, top, right, bottom = self.to_image_box(sel)
+        painter.setPen(Qt.white)
+        painter.drawText(sel.topLeft() + QPoint(4, -6) if sel.top() > 20 else sel.topLeft() + QPoint(4, 16),
+                         f"{right - left} × {bottom - top}")
+
+    # ------------------------------------------------------
+    # 마우스 / 키보드
+    # ------------------------------------------------------
+    def mousePressEvent(self, event):
+        if event.button() == Qt.RightButton:
+            self.finish()
+            return
+        if event.button() == Qt.LeftButton:
+            self.origin = event.position().toPoint()
+            self.current = self.origin
+            self.update()
+
+    def mouseMoveEvent(self, event):
+        if self.origin is not None:
+            self.current = event.position().toPoint()
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != Qt.LeftButton or self.origin is None:
+            return
+        self.current = event.position().toPoint()
+        sel = self.selection()
+        if sel.width() < MIN_SELECTION or sel.height() < MIN_SELECTION:
+            self.finish()
+            return
+        self.finish(self.to_image_box(sel))
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.finish()
+            return
+        super().keyPressEvent(event)
+
+    def closeEvent(self, event):
+        # 다른 이유로 닫혀도 (Alt+F4 등) 취소로 처리
+        if not self.done:
+            self.done = True
+            self.cancelled.emit()
+        super().closeEvent(event)
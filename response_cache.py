@@ -0,0 +1,218 @@
+import io
+import os
+import time
+import json
+import base64
+import hashlib
+import sqlite3
+import threading
+
+from PIL import Image
+from utils import log
+
+
+# ----------------------------------------------------------
+# 답변 캐시 기본값 (opt-in, storage/cache_settings.json)
+# ----------------------------------------------------------
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": False,        # 켜야만 동작
+    "ttl": 600,              # 초. 이보다 오래된 답변은 쓰지 않음
+    "max_entries": 200,      # 최대 답변 수 (넘으면 오래 안 쓴 것부터 삭제)
+    "max_mb": 20,            # 답변 글자 총량 상한
+    "history_messages": 4,   # 키에 넣을 직전 대화 수
+    "max_distance": 0,       # 0 = 같은 이미지만. 1 이상이면 dHash(256bit) 차이 비트 수까지 허용
+    "replay_chunk": 64,      # 재생할 때 on_delta 로 넘기는 글자 수
+}
+
+
+# ----------------------------------------------------------
+# 이미지 지문: "dHash:sha256"
+#   sha256: 인코딩된 이미지 바이트 그대로 → 같은 이미지인지 (기본은 이것만 봄)
+#   dHash:  17x16 흑백으로 줄인 뒤 옆 칸과 밝기 비교 → 256bit
+#           max_distance 를 켰을 때만 비슷한 화면 찾기에 씀
+# dHash 만으로는 글자만 다른 두 화면 (코드 페이지, 에러 줄) 이 같게 나올 수 있어서
+# 기본값은 정확히 같은 이미지만 같은 질문으로 본다.
+# ----------------------------------------------------------
+DHASH_W, DHASH_H = 16, 16
+DHASH_BITS = DHASH_W * DHASH_H
+
+
+def image_fingerprint(image_b64):
+    if not image_b64:
+        return ""
+    try:
+        data = base64.b64decode(image_b64)
+        img = Image.open(io.BytesIO(data))
+        # JPEG 은 디코딩 단계에서 작게 읽음
+        img.draft("L", (128, 128))
+        small = img.convert("L").resize((DHASH_W + 1, DHASH_H), Image.BILINEAR, reducing_gap=2.0)
+        px = list(small.getdata())
+    except Exception as e:
+        log(f"[response_cache] fingerprint ERROR: {e}")
+        return None
+
+    bits = 0
+    stride = DHASH_W + 1
+    for row in range(DHASH_H):
+        for col in range(DHASH_W):
+            bits = (bits << 1) | (px[row * stride + col] > px[row * stride + col + 1])
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    return f"{bits:0{DHASH_BITS // 4}x}:{digest}"
+
+
+# 같은 이미지면 0, 아니면 dHash 차이 비트 수 (dHash 가 같아도 최소 1)
+def hamming(a, b):
+    if a == b:
+        return 0
+    if not a or not b:
+        return DHASH_BITS
+    try:
+        return max(1, bin(int(a.split(":")[0], 16) ^ int(b.split(":")[0], 16)).count("1"))
+    except ValueError:
+        # 예전 형식 지문
+        return DHASH_BITS
+
+
+# ----------------------------------------------------------
+# 답변 캐시 (storage/response_cache.db)
+# ----------------------------------------------------------
+class ResponseCache:
+    """
+    키: 모델 + 시스템 프롬프트 해시 + 직전 대화 + 질문 글 (sha256)
+        + 이미지 지문 (기본은 같은 이미지만, max_distance 를 켜면 비슷한 화면도)
+    ttl 이 지난 답변은 쓰지 않고, 개수/용량을 넘으면 오래 안 쓴 것부터 지운다.
+    """
+
+    def __init__(self, path="storage/response_cache.db"):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA auto_vacuum=FULL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT, fingerprint TEXT, reply TEXT, "
+            "created REAL, last_used REAL, size INTEGER, "
+            "PRIMARY KEY (key, fingerprint))"
+        )
+        self.conn.commit()
+
+    # ------------------------------------------------------
+    # 찾기 → 답변 글 (없으면 None)
+    # ------------------------------------------------------
+    def get(self, key, fingerprint, settings):
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT fingerprint, reply FROM responses WHERE key=? AND created>=?",
+                (key, now - settings["ttl"])
+            ).fetchall()
+
+            best = None
+            for fp, reply in rows:
+                distance = hamming(fp, fingerprint)
+                if distance <= settings["max_distance"] and \
+                        (best is None or distance < best[0]):
+                    best = (distance, fp, reply)
+            if best is None:
+                return None
+
+            self.conn.execute(
+                "UPDATE responses SET last_used=? WHERE key=? AND fingerprint=?",
+                (now, key, best[1])
+            )
+            self.conn.commit()
+            return best[2]
+
+    # ------------------------------------------------------
+    # 저장 + 정리 (ttl / 개수 / 용량)
+    # ------------------------------------------------------
+    def put(self, key, fingerprint, reply, settings):
+        now = time.time()
+        size = len(reply.encode("utf-8"))
+        with self._lock:
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, fingerprint, reply, now, now, size)
+                )
+                self._evict(now, settings)
+                self.conn.commit()
+            except Exception as e:
+                log(f"[response_cache] put ERROR: {e}")
+
+    def _evict(self, now, settings):
+        self.conn.execute("DELETE FROM responses WHERE created<?", (now - settings["ttl"],))
+
+        max_bytes = int(settings["max_mb"] * 1024 * 1024)
+        count, total = self.conn.execute(
+            "SELECT count(*), coalesce(sum(size), 0) FROM responses"
+        ).fetchone()
+        if count <= settings["max_entries"] and total <= max_bytes:
+            return
+
+        # 오래 안 쓴 것부터 제한 안으로 들어올 때까지
+        rows = self.conn.execute(
+            "SELECT key, fingerprint, size FROM responses ORDER BY last_used"
+        ).fetchall()
+        for key, fp, size in rows:
+            if count <= settings["max_entries"] and total <= max_bytes:
+                break
+            self.conn.execute(
+                "DELETE FROM responses WHERE key=? AND fingerprint=?", (key, fp)
+            )
+            count -= 1
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+
+# ----------------------------------------------------------
+# 키 만들기
+# history: 이번 질문을 넣기 전의 대화 (메시지의 "_fp" = 그 질문의 지문)
+# 같은 질문을 다시 보낸 경우 직전의 같은 질문/답변은 빼고 계산해서
+# 에러 뒤에 다시 Enter 를 눌러도 같은 키가 나오게 한다.
+# "같은 질문" = 글이 같고 이미지 차이가 max_distance 이하
+# ----------------------------------------------------------
+def question_fp(text, fingerprint):
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{text_hash}:{fingerprint or ''}"
+
+
+def same_question(a, b, max_distance):
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    text_a, _, image_a = a.partition(":")
+    text_b, _, image_b = b.partition(":")
+    return text_a == text_b and hamming(image_a, image_b) <= max_distance
+
+
+def cache_key(model, system_prompt, history, text, qfp, settings, message_text):
+    history = list(history)
+    distance = settings["max_distance"]
+    while history:
+        last = history[-1]
+        if same_question(last.get("_fp"), qfp, distance):
+            history.pop()
+        elif last["role"] == "assistant" and len(history) >= 2 and \
+                same_question(history[-2].get("_fp"), qfp, distance):
+            history.pop()
+        else:
+            break
+
+    recent = history[-settings["history_messages"]:] if settings["history_messages"] else []
+    payload = {
+        "model": model,
+        "system": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+        "history": [[m["role"], m.get("_fp") or message_text(m)] for m in recent],
+        "text": text,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
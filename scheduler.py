@@ -0,0 +1,121 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils import log
+
+
+# ----------------------------------------------------------
+# 스케줄러 기본값 (storage/scheduler_settings.json)
+# ----------------------------------------------------------
+DEFAULT_SCHEDULER_SETTINGS = {
+    "max_concurrency": 2,   # 동시에 스트리밍할 세션 수 (같은 세션은 순서대로 1개씩)
+}
+
+
+# ----------------------------------------------------------
+# 예약된 요청 1개
+# ----------------------------------------------------------
+class RequestHandle:
+    """
+    submit() 이 돌려주는 핸들.
+    cancel(): 아직 대기 중이면 실행하지 않고, 실행 중이면 스트림을 바로 닫음.
+    future:   작업 결과 (concurrent.futures.Future)
+    """
+
+    def __init__(self, gpt, session_id):
+        self.gpt = gpt
+        self.session_id = session_id
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        if self.future is not None and self.future.cancel():
+            return
+        self.gpt.cancel(self.cancel_event)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+# ----------------------------------------------------------
+# 요청 스케줄러 (세션별 순서 보장 + 세션끼리만 동시 실행)
+# ----------------------------------------------------------
+class RequestScheduler:
+    """
+    같은 세션의 요청은 넣은 순서대로 하나씩 실행해서
+    대화 history / 기록 파일에 질문-답변 순서가 섞이지 않게 한다.
+    서로 다른 세션은 max_concurrency 개까지 동시에 실행된다.
+    채팅 창은 대화가 하나라 모든 요청이 "main" 세션으로 들어가 항상 하나씩 실행되고,
+    동시 실행은 세션을 따로 쓰는 호출자에게만 해당한다.
+    """
+
+    def __init__(self, gpt, max_concurrency=2):
+        self.gpt = gpt
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="gpt-request"
+        )
+        self._handles = set()
+        # session_id → 대기열 [(handle, job)] (맨 앞 = 실행 중)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    # job(handle) 을 대기열에 넣음 → RequestHandle
+    def submit(self, job, session_id="main"):
+        handle = RequestHandle(self.gpt, session_id)
+        handle.future = Future()
+
+        with self._lock:
+            self._handles.add(handle)
+            queue = self._sessions.get(session_id)
+            if queue is None:
+                # 이 세션을 처리하는 스레드가 없음 → 새로 맡김
+                queue = self._sessions[session_id] = deque()
+                self._executor.submit(self._run_session, session_id, queue)
+            queue.append((handle, job))
+
+        # 대기 중 취소되면 실행되지 않으므로 여기서 정리
+        handle.future.add_done_callback(lambda f: self._forget(handle))
+        log(f"[scheduler] submit ({len(self._handles)}개 진행/대기)")
+        return handle
+
+    # 세션 대기열이 빌 때까지 순서대로 실행
+    def _run_session(self, session_id, queue):
+        while True:
+            with self._lock:
+                handle, job = queue[0]
+            self._run(handle, job)
+            with self._lock:
+                queue.popleft()
+                if not queue:
+                    del self._sessions[session_id]
+                    return
+
+    def _run(self, handle, job):
+        # 대기 중에 취소된 요청은 건너뜀
+        if not handle.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = None if handle.cancel_event.is_set() else job(handle)
+        except BaseException as e:
+            handle.future.set_exception(e)
+        else:
+            handle.future.set_result(result)
+
+    def _forget(self, handle):
+        with self._lock:
+            self._handles.discard(handle)
+
+    def active(self, session_id=None):
+        with self._lock:
+            return [h for h in self._handles
+                    if session_id is None or h.session_id == session_id]
+
+    def cancel_all(self, session_id=None):
+        for handle in self.active(session_id):
+            handle.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import threading
+
+from utils import log
+
+
+# 검색 결과 미리보기 앞뒤 글자 수
+SNIPPET_CHARS = 40
+
+
+# ----------------------------------------------------------
+# 대화 기록 전문 검색 (storage/search.db, SQLite FTS5 trigram)
+# ----------------------------------------------------------
+class SearchIndex:
+    """
+    chat_history.jsonl 의 한 줄 = 한 행 (rowid = 파일 내 위치 "_offset").
+    trigram 토크나이저라 띄어쓰기 없는 한국어도 부분 문자열로 찾는다.
+    - 3글자 이상 단어: FTS5 MATCH (인덱스 사용)
+    - 1~2글자 단어: instr 로 전체 비교 (trigram 으로는 못 찾음)
+    FTS5/trigram 이 없는 SQLite 면 일반 테이블 + instr 로 동작한다.
+    기록 파일이 원본이고 이 DB 는 언제든 다시 만들 수 있다.
+    """
+
+    def __init__(self, path="storage/search.db"):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+
+        self.fts = True
+        try:
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+                "text, role UNINDEXED, date UNINDEXED, timestamp UNINDEXED, "
+                "tokenize='trigram')"
+            )
+        except sqlite3.OperationalError as e:
+            log(f"[search_index] FTS5 trigram 사용 불가 ({e}) → 일반 검색")
+            self.fts = False
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "rowid INTEGER PRIMARY KEY, text, role, date, timestamp)"
+            )
+        self.conn.commit()
+
+    # ------------------------------------------------------
+    # 색인 위치 (기록 파일에서 여기까지 반영됨)
+    # 파일 처음부터 빈틈 없이 색인된 끝 위치. 앱이 sync 도중에 꺼져도
+    # 다음 sync 가 여기서부터 이어서 채운다.
+    # ------------------------------------------------------
+    @property
+    def indexed_until(self):
+        with self._lock:
+            return self._indexed_until()
+
+    def _indexed_until(self):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key='indexed_until'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    # start: 이번에 색인한 부분의 시작 위치
+    # 색인 위치와 맞닿아 있을 때만 앞으로 옮긴다 (sync 가 아직 못 채운 빈틈을 건너뛰지 않음)
+    def _set_indexed_until(self, start, end):
+        if self._indexed_until() != start:
+            return
+        self.conn.execute(
+            "INSERT INTO meta(key, value) VALUES('indexed_until', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+            (end,)
+        )
+
+    # ------------------------------------------------------
+    # 추가 (HistoryStore.append 에서 호출)
+    # offset: 줄 시작 위치 / end: 줄 끝 위치
+    # ------------------------------------------------------
+    def add(self, offset, entry, end):
+        self.add_many([(offset, entry)], offset, end)
+
+    # items 는 기록 파일의 start ~ end 구간을 빠짐없이 담고 있어야 함
+    def add_many(self, items, start, end):
+        rows = []
+        for offset, entry in items:
+            text = index_text(entry)
+            if text:
+                rows.append((offset, text, entry.get("role", ""),
+                             entry.get("date", ""), entry.get("timestamp", "")))
+        with self._lock:
+            try:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO messages(rowid, text, role, date, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._set_indexed_until(start, end)
+                self.conn.commit()
+            except Exception as e:
+                log(f"[search_index] add ERROR: {e}")
+
+    # 기록 파일에는 있는데 색인에 없는 부분 채우기 (시작 시 1회)
+    def sync(self, history_store, batch=500):
+        start = self.indexed_until
+        if start > history_store.size():
+            # 기록 파일이 새로 만들어짐 → 처음부터
+            self.clear()
+            start = 0
+
+        # 배치마다 색인 위치를 옮겨서 중간에 꺼져도 다음에 이어서 함
+        items = []
+        count = 0
+        for offset, entry, end in history_store.iter_entries(start):
+            items.append((offset, entry))
+            if len(items) >= batch:
+                self.add_many(items, start, end)
+                count += len(items)
+                items = []
+                start = end
+        if items:
+            self.add_many(items, start, end)
+            count += len(items)
+        if count:
+            log(f"[search_index] {count}개 메시지 색인")
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM messages")
+            self.conn.execute("DELETE FROM meta WHERE key='indexed_until'")
+            self.conn.commit()
+
+    # ------------------------------------------------------
+    # 검색 → 최신순 [{offset, role, date, timestamp, snippet}]
+    # 공백으로 나눈 단어가 모두 들어 있는 메시지
+    # ------------------------------------------------------
+    def search(self, query, limit=50):
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+
+        long_terms = [t for t in terms if len(t) >= 3] if self.fts else []
+        short_terms = [t for t in terms if t not in long_terms]
+
+        where = []
+        params = []
+        if long_terms:
+            where.append("messages MATCH ?")
+            params.append(" AND ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+        for t in short_terms:
+            where.append("instr(lower(text), lower(?)) > 0")
+            params.append(t)
+
+        sql = (
+            "SELECT rowid, text, role, date, timestamp FROM messages "
+            f"WHERE {' AND '.join(where)} ORDER BY rowid DESC LIMIT ?"
+        )
+        params.append(limit)
+
+        with self._lock:
+            try:
+                rows = self.conn.execute(sql, params).fetchall()
+            except Exception as e:
+                log(f"[search_index] search ERROR: {e}")
+                return []
+
+        return [
+            {"offset": rowid, "role": role, "date": date, "timestamp": ts,
+             "snippet": make_snippet(text, terms)}
+            for rowid, text, role, date, ts in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# 기록 항목에서 검색할 글 (캡처의 OCR 글자 포함)
+def index_text(entry):
+    parts = [entry.get("text") or "", entry.get("ocr") or ""]
+    return "\n".join(p.strip() for p in parts if p.strip())
+
+
+# 첫 번째로 찾은 단어 주변만 한 줄로
+def make_snippet(text, terms, width=SNIPPET_CHARS):
+    lower = text.lower()
+    pos = -1
+    for t in terms:
+        pos = lower.find(t.lower())
+        if pos >= 0:
+            break
+    pos = max(pos, 0)
+
+    start = max(0, pos - width)
+    end = min(len(text), pos + width * 2)
+    snippet = " ".join(text[start:end].split())
+    if start > 0:
+        snippet = "…" + snippet
+    if end < len(text):
+        snippet += "…"
+    return snippet
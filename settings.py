@@ -0,0 +1,74 @@
+import os
+import threading
+
+from utils import log, load_json, save_json
+
+
+# ----------------------------------------------------------
+# 설정 서비스 (storage/*.json 공용 캐시)
+# ----------------------------------------------------------
+class Settings:
+    """
+    storage/<name>.json 을 한 번만 읽어 캐시해 두고
+    파일 mtime 이 바뀌었거나 set() 으로 저장했을 때만 다시 읽는다.
+    반환값은 캐시된 객체 그대로이므로 고쳐 쓰지 말고 set() 으로 저장할 것.
+    """
+
+    def __init__(self, root="storage"):
+        self.root = root
+        self._cache = {}        # name → (mtime_ns, value)
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.root, name + ".json")
+
+    def _mtime(self, name):
+        try:
+            return os.stat(self.path(name)).st_mtime_ns
+        except OSError:
+            return None
+
+    # ------------------------------------------------------
+    # 읽기 (변경 없으면 stat 1번만)
+    # ------------------------------------------------------
+    def get(self, name, default=None):
+        mtime = self._mtime(name)
+        if mtime is None:
+            return default
+
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and cached[0] == mtime:
+                value = cached[1]
+            else:
+                value = load_json(self.path(name))
+                self._cache[name] = (mtime, value)
+                log(f"[settings] {name} 다시 읽음")
+
+        return default if value is None else value
+
+    # 기본값 + storage/<name>.json 에 있는 같은 키 (모르는 키는 무시)
+    def get_with_defaults(self, name, defaults):
+        return with_defaults(defaults, self.get(name))
+
+    # ------------------------------------------------------
+    # 저장 + 캐시 갱신
+    # ------------------------------------------------------
+    def set(self, name, value):
+        save_json(self.path(name), value)
+        with self._lock:
+            self._cache[name] = (self._mtime(name), value)
+
+
+# 기본값 사본에 cfg 의 같은 키만 덮어씀
+def with_defaults(defaults, cfg=None):
+    merged = dict(defaults)
+    if cfg:
+        for key in defaults:
+            if key in cfg:
+                merged[key] = cfg[key]
+    return merged
+
+
+# 앱 전체에서 함께 쓰는 인스턴스
+settings = Settings()
@@ -0,0 +1,58 @@
+from PySide6.QtCore import QObject, QTimer
+
+from tracing import span
+
+
+# 스크롤이 바닥에서 이 정도(px) 안에 있으면 "바닥에 붙어 있음"으로 간주
+PIN_THRESHOLD = 24
+
+
+# ----------------------------------------------------------
+# 스트리밍 답변 렌더러 (토큰을 모아서 프레임 단위로 그림)
+# ----------------------------------------------------------
+class StreamRenderer(QObject):
+    """
+    토큰마다 setText + 스크롤 하던 것을 fps 주기로 한 번만 하도록 묶는다.
+    사용자가 위로 스크롤해서 읽고 있으면 자동 스크롤하지 않는다.
+    """
+
+    def __init__(self, label, scroll_bar, fps=30, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self.bar = scroll_bar
+        self.text = ""
+        self.pending = []
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(max(1, 1000 // fps))
+        self.timer.timeout.connect(self.flush)
+
+    def push(self, chunk):
+        if not chunk:
+            return
+        self.pending.append(chunk)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        if not self.pending:
+            self.timer.stop()
+            return
+
+        with span("stream_render"):
+            pinned = self.bar.value() >= self.bar.maximum() - PIN_THRESHOLD
+
+            self.text += "".join(self.pending)
+            self.pending.clear()
+            self.label.setText(self.text)
+
+        if pinned:
+            # 레이아웃이 다시 계산된 뒤 바닥으로
+            QTimer.singleShot(0, self._scroll_to_bottom)
+
+    def finish(self):
+        self.flush()
+        self.timer.stop()
+
+    def _scroll_to_bottom(self):
+        self.bar.setValue(self.bar.maximum())
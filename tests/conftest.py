@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 최상위 모듈 (backends, gpt_client ...) 을 import 할 수 있게
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
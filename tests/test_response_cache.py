@@ -0,0 +1,76 @@
+import io
+import base64
+
+from PIL import Image
+
+from backends import MockBackend
+from gpt_client import GPTClient
+from response_cache import ResponseCache, image_fingerprint, hamming
+from settings import settings
+
+
+class CountingBackend(MockBackend):
+
+    def __init__(self):
+        super().__init__(ttft=0, token_rate=0, tokens=3, echo=False)
+        self.calls = 0
+
+    def open_stream(self, model, messages, cancel_event=None):
+        self.calls += 1
+        return super().open_stream(model, messages, cancel_event)
+
+
+def png_b64(img):
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+# 설정은 tmp_path 에서만 읽음 (실제 storage/*.json 과 무관하게)
+def make_client(tmp_path, monkeypatch, **cfg):
+    monkeypatch.setattr(settings, "root", str(tmp_path))
+    settings.set("cache_settings", dict(enabled=True, **cfg))
+    backend = CountingBackend()
+    gpt = GPTClient(backend=backend)
+    gpt._cache = ResponseCache(str(tmp_path / "response_cache.db"))
+    return gpt, backend
+
+
+def screens():
+    a = Image.linear_gradient("L").resize((320, 200)).convert("RGB")
+    b = a.copy()
+    b.putpixel((100, 100), (255, 0, 0))
+    return png_b64(a), png_b64(b)
+
+
+def test_exact_reask_hits_cache(tmp_path, monkeypatch):
+    gpt, backend = make_client(tmp_path, monkeypatch)
+    a, _ = screens()
+
+    first = gpt.send_message("q", a)
+    second = gpt.send_message("q", a)
+
+    assert backend.calls == 1
+    assert second == first
+
+
+def test_near_duplicate_reask_hits_cache(tmp_path, monkeypatch):
+    gpt, backend = make_client(tmp_path, monkeypatch, max_distance=40)
+    a, b = screens()
+    assert 1 <= hamming(image_fingerprint(a), image_fingerprint(b)) <= 40
+
+    first = gpt.send_message("q", a)
+    second = gpt.send_message("q", b)
+
+    assert backend.calls == 1
+    assert second == first
+
+
+def test_near_duplicate_misses_by_default(tmp_path, monkeypatch):
+    gpt, backend = make_client(tmp_path, monkeypatch)
+    a, b = screens()
+
+    gpt.send_message("q", a)
+    gpt.send_message("q", b)
+
+    assert backend.calls == 2
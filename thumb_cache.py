@@ -0,0 +1,129 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+from PySide6.QtGui import QPixmap, QColor
+
+from utils import log, ImageBuffer
+from image_pipeline import make_thumbnail, THUMB_WIDTH
+from tracing import span
+
+
+# ----------------------------------------------------------
+# 말풍선용 썸네일 캐시 (메모리 LRU + storage/thumbs 디스크)
+# ----------------------------------------------------------
+class ThumbCache:
+    """
+    말풍선은 width 폭의 작은 pixmap 만 들고 있고,
+    원본은 뷰어를 열 때 image_store 에서 다시 읽는다.
+    - 메모리: ref → QPixmap, 최근 max_items 개 (GUI 스레드에서만 사용)
+    - 디스크: storage/thumbs/<sha256>_<width>.png (앱을 다시 켜도 재사용)
+    """
+
+    def __init__(self, image_store, root="storage/thumbs", width=THUMB_WIDTH, max_items=300):
+        self.store = image_store
+        self.root = root
+        self.width = width
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, ref):
+        name = ref.rsplit(".", 1)[0]
+        return os.path.join(self.root, f"{name}_{self.width}.png")
+
+    # ------------------------------------------------------
+    # ref → 썸네일 QPixmap (메모리 → 디스크 → 원본에서 생성)
+    # ------------------------------------------------------
+    def get(self, ref):
+        if not ref:
+            return None
+
+        pix = self._remember_get(ref)
+        if pix is not None:
+            return pix
+
+        with span("thumbnail", ref=ref[:12]):
+            path = self.path(ref)
+            if os.path.exists(path):
+                pix = QPixmap(path)
+                if pix.isNull():
+                    pix = None
+
+            if pix is None:
+                thumb = self._generate(ref)
+                if thumb is None:
+                    return None
+                pix = pil_to_pixmap(thumb)
+                self._save(ref, thumb)
+
+        self._remember(ref, pix)
+        return pix
+
+    def put(self, ref, pix):
+        if not ref or pix is None or pix.isNull():
+            return
+        self._remember(ref, pix)
+        path = self.path(ref)
+        if not os.path.exists(path):
+            try:
+                os.makedirs(self.root, exist_ok=True)
+                pix.save(path, "PNG")
+            except Exception as e:
+                log(f"[thumb_cache] save ERROR: {e}")
+
+    # ------------------------------------------------------
+    # 내부
+    # ------------------------------------------------------
+    def _remember_get(self, ref):
+        with self._lock:
+            pix = self._memory.get(ref)
+            if pix is not None:
+                self._memory.move_to_end(ref)
+            return pix
+
+    def _remember(self, ref, pix):
+        with self._lock:
+            self._memory[ref] = pix
+            self._memory.move_to_end(ref)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _generate(self, ref):
+        data = self.store.read_bytes(ref)
+        if data is None:
+            return None
+        try:
+            img = Image.open(io.BytesIO(data))
+            # JPEG 은 디코딩 단계에서 1/2~1/8 로 줄여서 읽음
+            img.draft("RGB", (self.width * 2, self.width * 2))
+            return make_thumbnail(img, self.width)
+        except Exception as e:
+            log(f"[thumb_cache] decode ERROR: {e}")
+            return None
+
+    def _save(self, ref, thumb):
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = self.path(ref) + ".tmp"
+            thumb.save(tmp_path, format="PNG")
+            os.replace(tmp_path, self.path(ref))
+        except Exception as e:
+            log(f"[thumb_cache] save ERROR: {e}")
+
+
+# ----------------------------------------------------------
+# PIL → QPixmap
+# ----------------------------------------------------------
+def pil_to_pixmap(img):
+    return ImageBuffer.from_pil(img).to_qpixmap()
+
+
+# 썸네일이 준비되기 전 자리 (원본 비율의 회색 상자)
+def placeholder_pixmap(size, width=THUMB_WIDTH):
+    w, h = size
+    pix = QPixmap(width, max(1, round(h * width / w)) if w else width)
+    pix.fill(QColor("#e6e6e6"))
+    return pix
@@ -0,0 +1,175 @@
+import os
+import json
+import atexit
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+# ----------------------------------------------------------
+# 단계별 시간 측정 (Chrome trace JSON 으로 저장)
+# chrome://tracing 또는 https://ui.perfetto.dev 에서 열 수 있음
+# ----------------------------------------------------------
+class Tracer:
+    """
+    span("capture") 으로 감싼 구간을 기록한다.
+    - 파일: storage/traces/trace.json (max_mb 를 넘으면 trace.1.json … 으로 밀림)
+      기본은 꺼져 있음 (trace_settings.json 의 enabled). 쓰기는 모아서
+      flush_interval 초마다 한 번만 디스크로 보냄 (GUI 스레드의 잦은 span 때문)
+    - 메모리: 이름별 최근 200개 → summary() 로 p50/p95 (파일을 꺼도 동작)
+    utils 보다 아래 단계라 다른 앱 모듈을 import 하지 않는다.
+    """
+
+    def __init__(self, root="storage/traces", max_mb=5, keep=3, enabled=False,
+                 flush_interval=1.0):
+        self.root = root
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.keep = keep
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._file = None
+        self._named_threads = set()
+        self._stats = {}
+
+    def configure(self, enabled=None, max_mb=None, keep=None, root=None,
+                  flush_interval=None):
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+                if not enabled:
+                    self._close()
+            if flush_interval is not None:
+                self.flush_interval = flush_interval
+            if max_mb is not None:
+                self.max_bytes = int(max_mb * 1024 * 1024)
+            if keep is not None:
+                self.keep = keep
+            if root is not None and root != self.root:
+                self._close()
+                self.root = root
+
+    @property
+    def path(self):
+        return os.path.join(self.root, "trace.json")
+
+    # ------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter(), **args)
+
+    # start/end 는 time.perf_counter() 값
+    def record(self, name, start, end, **args):
+        ms = (end - start) * 1000
+
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = deque(maxlen=200)
+            stats.append(ms)
+
+            if not self.enabled:
+                return
+
+            tid = threading.get_ident()
+            event = {
+                "name": name, "ph": "X", "pid": self._pid, "tid": tid,
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(ms * 1000, 1),
+            }
+            if args:
+                event["args"] = args
+
+            try:
+                if self._file is None:
+                    self._open()
+                if tid not in self._named_threads:
+                    self._named_threads.add(tid)
+                    self._write({
+                        "name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                        "args": {"name": threading.current_thread().name},
+                    })
+                self._write(event)
+            except Exception:
+                # 측정 때문에 앱이 멈추면 안 됨
+                self.enabled = False
+
+    # ------------------------------------------------------
+    # 파일 (JSON 배열 형식, 닫는 ']' 없이 이어 쓰기 - Chrome 이 허용)
+    # ------------------------------------------------------
+    def _write(self, event):
+        if self._file is None:
+            self._open()
+        self._file.write(json.dumps(event, ensure_ascii=False) + ",\n")
+        now = time.perf_counter()
+        if now - self._last_flush >= self.flush_interval:
+            self._last_flush = now
+            self._file.flush()
+        if self._file.tell() > self.max_bytes:
+            self._rotate()
+
+    # 버퍼에 남은 기록을 파일로 (종료할 때)
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def _open(self):
+        os.makedirs(self.root, exist_ok=True)
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", encoding="utf-8")
+        if new:
+            self._file.write("[\n")
+        self._named_threads.clear()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        self._close()
+        # trace.json → trace.1.json → … → trace.<keep-1>.json (가장 오래된 것은 덮어씀)
+        for i in range(self.keep - 1, 0, -1):
+            src = self.path if i == 1 else os.path.join(self.root, f"trace.{i - 1}.json")
+            dst = os.path.join(self.root, f"trace.{i}.json")
+            if os.path.exists(src):
+                os.replace(src, dst)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    # ------------------------------------------------------
+    # 이름별 요약 (ms)
+    # ------------------------------------------------------
+    def summary(self):
+        with self._lock:
+            items = {name: list(values) for name, values in self._stats.items()}
+
+        result = {}
+        for name, values in items.items():
+            ordered = sorted(values)
+            result[name] = {
+                "count": len(values),
+                "last": values[-1],
+                "p50": ordered[(len(ordered) - 1) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max": ordered[-1],
+            }
+        return result
+
+
+# 앱 전체에서 함께 쓰는 인스턴스
+tracer = Tracer()
+span = tracer.span
+atexit.register(tracer.flush)
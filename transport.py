@@ -0,0 +1,261 @@
+import time
+import queue
+import random
+import socket
+import threading
+
+import httpx
+import openai
+from openai import OpenAI
+
+from utils import log
+
+
+# ----------------------------------------------------------
+# 통신 설정 기본값 (storage/transport_settings.json)
+# ----------------------------------------------------------
+DEFAULT_TRANSPORT_SETTINGS = {
+    "base_url": None,             # None = OpenAI. 로컬 mock 서버 주소로 바꿔서 테스트
+    "connect_timeout": 5.0,       # TCP/TLS 연결
+    "read_timeout": 30.0,         # 스트림 조각 사이 최대 대기
+    "write_timeout": 30.0,        # 업로드 (큰 캡처)
+    "pool_timeout": 5.0,          # 연결 풀 대기
+    "first_token_timeout": 30.0,  # 요청 후 첫 글자까지
+    "max_retries": 3,             # 첫 글자 전 일시적 오류 재시도 횟수
+    "backoff_base": 0.5,          # 재시도 대기 (초, 지수 증가 + jitter)
+    "backoff_max": 8.0,
+    "max_connections": 10,
+    "max_keepalive": 5,
+    "keepalive_expiry": 120.0,    # 유휴 연결 유지 시간
+    "prewarm": True,              # 시작할 때 미리 연결 (TLS 핸드셰이크)
+}
+
+
+# ----------------------------------------------------------
+# keep-alive 연결 풀을 쓰는 OpenAI 클라이언트
+# ----------------------------------------------------------
+def build_openai_client(api_key, settings):
+    timeout = httpx.Timeout(
+        connect=settings["connect_timeout"],
+        read=settings["read_timeout"],
+        write=settings["write_timeout"],
+        pool=settings["pool_timeout"],
+    )
+    limits = httpx.Limits(
+        max_connections=settings["max_connections"],
+        max_keepalive_connections=settings["max_keepalive"],
+        keepalive_expiry=settings["keepalive_expiry"],
+    )
+    http_client = httpx.Client(timeout=timeout, limits=limits)
+
+    return OpenAI(
+        api_key=api_key,
+        base_url=settings["base_url"] or None,
+        http_client=http_client,
+        timeout=timeout,
+        max_retries=0,   # 재시도는 ChatStream 이 직접 (첫 글자 timeout 포함)
+    )
+
+
+# ----------------------------------------------------------
+# 연결 미리 열어두기 (백그라운드, 실패해도 무시)
+# ----------------------------------------------------------
+def prewarm(client):
+    def run():
+        start = time.perf_counter()
+        try:
+            client.with_options(timeout=10.0).models.list()
+            ms = (time.perf_counter() - start) * 1000
+            log(f"[transport] prewarm {ms:.0f} ms")
+        except Exception as e:
+            log(f"[transport] prewarm 실패: {e}")
+
+    t = threading.Thread(target=run, name="transport-prewarm", daemon=True)
+    t.start()
+    return t
+
+
+# ----------------------------------------------------------
+# 재시도 판단 / 대기 시간
+# ----------------------------------------------------------
+class FirstTokenTimeout(Exception):
+    pass
+
+
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,     # APITimeoutError 포함
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+    FirstTokenTimeout,
+)
+
+
+def is_transient(exc):
+    return isinstance(exc, TRANSIENT_ERRORS)
+
+
+def backoff_delay(attempt, settings):
+    # full jitter: 0 ~ min(max, base * 2^attempt)
+    cap = min(settings["backoff_max"], settings["backoff_base"] * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+# ----------------------------------------------------------
+# 스트리밍 요청 (재시도 + 첫 글자 timeout)
+# ----------------------------------------------------------
+# 읽기 스레드 → 소비자 큐에 넣는 항목 종류
+_PIECE, _DONE, _ERROR = "piece", "done", "error"
+
+# 소비자가 중단 여부를 확인하는 간격 (초)
+POLL_INTERVAL = 0.1
+
+
+class _Attempt:
+    """
+    요청 1회 (재시도마다 새로 만듦).
+    HTTP 읽기는 전용 스레드가 하고, 조각은 queue 로 넘긴다.
+    abandoned 가 되면 읽기 스레드는 다음 조각에서 스스로 스트림을 닫는다.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.abandoned = False
+        self.stream = None
+
+
+class ChatStream:
+    """
+    for piece in ChatStream(...) 로 답변 조각(str)을 받는다.
+    첫 글자가 오기 전의 일시적 오류는 jitter backoff 로 재시도하고,
+    first_token_timeout 안에 첫 글자가 없으면 그 시도는 버리고 재시도한다.
+    HTTP 연결은 읽기 스레드에서만 다루므로, 헤더를 기다리는 중이든
+    조각을 읽는 중이든 소비자는 기다리지 않고 바로 다음으로 넘어간다.
+    """
+
+    def __init__(self, client, settings, cancel_event=None, **request):
+        self.client = client
+        self.settings = settings
+        self.request = request
+        self._attempt = None
+        # 밖에서 넘겨준 Event 를 set 하면 중단 (요청 전이면 아예 보내지 않음)
+        self.cancel_event = cancel_event or threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    # ------------------------------------------------------
+    # 읽기 스레드
+    # ------------------------------------------------------
+    def _read(self, attempt):
+        stream = None
+        try:
+            stream = self.client.chat.completions.create(stream=True, **self.request)
+            attempt.stream = stream
+            for chunk in stream:
+                if attempt.abandoned:
+                    return
+                if chunk.choices:
+                    delta = chunk.choices[0].delta
+                    if hasattr(delta, "content") and delta.content:
+                        attempt.queue.put((_PIECE, delta.content))
+            attempt.queue.put((_DONE, None))
+        except Exception as e:
+            attempt.queue.put((_ERROR, e))
+        finally:
+            if stream is not None:
+                try:
+                    stream.close()
+                except Exception as e:
+                    log(f"[transport] close ERROR: {e}")
+
+    def _start_attempt(self):
+        attempt = _Attempt()
+        self._attempt = attempt
+        threading.Thread(
+            target=self._read, args=(attempt,), name="chat-stream", daemon=True
+        ).start()
+        return attempt
+
+    # 다음 항목 대기 (중단되면 None, deadline 이 지나면 FirstTokenTimeout)
+    def _next(self, attempt, deadline=None):
+        while not self.cancelled:
+            wait = POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise FirstTokenTimeout(
+                        f"no token within {self.settings['first_token_timeout']}s"
+                    )
+                wait = min(wait, remaining)
+            try:
+                return attempt.queue.get(timeout=wait)
+            except queue.Empty:
+                pass
+        return None
+
+    def __iter__(self):
+        attempt_no = 0
+        while not self.cancelled:
+            attempt = self._start_attempt()
+            deadline = time.monotonic() + self.settings["first_token_timeout"]
+            started = False
+            try:
+                while True:
+                    item = self._next(attempt, None if started else deadline)
+                    if item is None:
+                        return
+                    kind, value = item
+                    if kind == _DONE:
+                        return
+                    if kind == _ERROR:
+                        raise value
+                    started = True
+                    yield value
+
+            except Exception as e:
+                # close() 로 끊은 것은 오류가 아님
+                if self.cancelled:
+                    return
+                if isinstance(e, FirstTokenTimeout):
+                    log("[transport] 첫 글자 timeout → 이 시도는 버림")
+
+                # 이미 글자를 내보냈으면 재시도하면 답변이 중복됨
+                if started or not is_transient(e) or attempt_no >= self.settings["max_retries"]:
+                    raise e
+
+                delay = backoff_delay(attempt_no, self.settings)
+                log(f"[transport] {type(e).__name__}: {e} → {delay:.2f}s 후 재시도")
+                attempt_no += 1
+                self.cancel_event.wait(delay)   # 대기 중에도 중단 가능
+
+            finally:
+                # 끝났거나 버린 시도 → 읽기 스레드가 알아서 정리
+                attempt.abandoned = True
+
+    # 사용자가 중단 → 재시도하지 않고 바로 끝냄 (다른 스레드에서 호출 가능)
+    # 소비자는 바로 깨우고, 읽기 스레드가 막혀 있는 소켓은 shutdown 으로 풀어줌
+    def close(self):
+        self.cancel_event.set()
+        attempt = self._attempt
+        if attempt is None:
+            return
+        attempt.abandoned = True
+        attempt.queue.put((_DONE, None))
+        _shutdown_socket(attempt.stream)
+
+
+# 스트림의 TCP 소켓을 끊음 (close 와 달리 다른 스레드에서 불러도 안전)
+# 헤더를 받기 전이면 소켓을 알 수 없으니 읽기 스레드가 헤더를 받은 뒤 닫는다.
+def _shutdown_socket(stream):
+    response = getattr(stream, "response", None)
+    if response is None:
+        return
+    try:
+        network = response.extensions.get("network_stream")
+        sock = network.get_extra_info("socket") if network is not None else None
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except Exception as e:
+        log(f"[transport] socket shutdown ERROR: {e}")
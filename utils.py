@@ -7,6 +7,8 @@ import traceback
 from PIL import Image
 import numpy as np
 
+from tracing import span
+
 
 # ----------------------------------------------------------
 # DEBUG 출력
@@ -59,9 +61,10 @@ def now_timestamp():
 def image_to_base64(pil_img):
     try:
         import io
-        buffer = io.BytesIO()
-        pil_img.save(buffer, format="PNG")
-        return base64.b64encode(buffer.getvalue()).decode()
+        with span("image_to_base64"):
+            buffer = io.BytesIO()
+            pil_img.save(buffer, format="PNG")
+            return base64.b64encode(buffer.getvalue()).decode()
     except Exception as e:
         log(f"[image_to_base64] ERROR: {e}")
         log(traceback.format_exc())
@@ -104,6 +107,93 @@ def np_to_pil(np_img):
         return None
 
 
+# ----------------------------------------------------------
+# Qt ↔ PIL 픽셀 전달 (stride 를 지켜서, 복사는 한 번만)
+# ----------------------------------------------------------
+class ImageBuffer:
+    """
+    raw 픽셀(행 단위, stride = 한 줄 바이트 수)을 들고 Qt / PIL 사이를 옮긴다.
+    - from_qimage: QImage 메모리를 그대로 가리킴 (복사 없음)
+    - from_pil:    PIL 내부 메모리는 꺼낼 수 없어서 tobytes 로 한 번 복사
+    - to_qimage:   버퍼를 그대로 가리키는 QImage (이 객체가 살아 있어야 함)
+    - to_pil:      한 번 복사해서 따로 소유하는 이미지
+                   (ImageBuffer.from_qimage(q).to_pil() 처럼 버퍼가 바로 사라져도 안전)
+    즉 QImage → PIL, PIL → QImage 모두 픽셀 복사는 한 번이다.
+    """
+
+    # mode → (채널 수, QImage 형식 이름)
+    MODES = {
+        "L": (1, "Format_Grayscale8"),
+        "RGB": (3, "Format_RGB888"),
+        "RGBA": (4, "Format_RGBA8888"),
+    }
+
+    def __init__(self, data, width, height, mode="RGB", stride=None, owner=None):
+        if mode not in self.MODES:
+            raise ValueError(f"지원하지 않는 mode: {mode}")
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.channels = self.MODES[mode][0]
+        self.stride = stride or width * self.channels
+        self.data = memoryview(data).cast("B")
+        # 메모리를 실제로 가진 객체 (QImage 등) 를 붙잡아 둠
+        self._owner = owner if owner is not None else data
+
+        if len(self.data) < self.stride * (height - 1) + width * self.channels:
+            raise ValueError("버퍼 크기가 이미지보다 작음")
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    # ------------------------------------------------------
+    # 만들기
+    # ------------------------------------------------------
+    @classmethod
+    def from_pil(cls, img):
+        if img.mode not in cls.MODES:
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        return cls(img.tobytes(), img.width, img.height, img.mode)
+
+    @classmethod
+    def from_qimage(cls, qimg):
+        from PySide6.QtGui import QImage
+
+        formats = {
+            QImage.Format_Grayscale8: "L",
+            QImage.Format_RGB888: "RGB",
+            QImage.Format_RGBA8888: "RGBA",
+        }
+        if qimg.format() not in formats:
+            qimg = qimg.convertToFormat(
+                QImage.Format_RGBA8888 if qimg.hasAlphaChannel() else QImage.Format_RGB888
+            )
+        mode = formats[qimg.format()]
+        # 줄 끝 패딩이 있을 수 있으므로 bytesPerLine 을 그대로 stride 로
+        return cls(qimg.constBits(), qimg.width(), qimg.height(), mode,
+                   stride=qimg.bytesPerLine(), owner=qimg)
+
+    # ------------------------------------------------------
+    # 보기
+    # ------------------------------------------------------
+    def to_pil(self):
+        return Image.frombytes(self.mode, self.size, self.data, "raw",
+                               self.mode, self.stride, 1)
+
+    def to_qimage(self):
+        from PySide6.QtGui import QImage
+
+        fmt = getattr(QImage, self.MODES[self.mode][1])
+        return QImage(self.data, self.width, self.height, self.stride, fmt)
+
+    # 화면에 그릴 때 (GPU/윈도 시스템 쪽으로 한 번 올라감, GUI 스레드에서만)
+    def to_qpixmap(self):
+        from PySide6.QtGui import QPixmap
+
+        return QPixmap.fromImage(self.to_qimage())
+
+
 def today_str():
     from datetime import datetime
     return datetime.now().strftime("%Y-%m-%d")